@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+# Benchmarks of the rename pipeline against a fake tmux server and a synthetic process table.
+# Usage: benchmarks/bench_rename.py [--windows 10 100] [--processes 100] [--save | --check]
+
+import json
+import os
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+from unittest import mock
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCHMARKS_DIR, '..', 'scripts'))
+
+import name_cache
+import process_utils
+import rename_session_windows
+from fake_tmux import FakePsProcess, FakeServer, Scenario, make_proc_dir, make_ps_output
+from path_utils import Pane, get_exclusive_paths
+from rename_session_windows import Options, get_panes_programs, post_restore, rename_windows
+
+BASELINES_FILE = os.path.join(BENCHMARKS_DIR, 'baselines.json')
+PROCESS_SOURCES = ['ps', 'proc']
+
+
+@dataclass
+class Result:
+    wall_ms: float
+    tmux_commands: int
+    tmux_invocations: int
+    subprocesses: int  # tmux invocations and ps runs
+
+
+@contextmanager
+def process_table(scenario: Scenario, source: str) -> Iterator[List[int]]:
+    """Serve the scenario processes from a fake /proc or from a synthetic `ps` output
+
+    Yields:
+        Counter of the ps runs, in a list to be updated
+    """
+    processes = scenario.make_processes()
+    ps_runs = [0]
+    popen = process_utils.subprocess.Popen
+
+    def fake_popen(args: List[str], *popen_args, **kwargs):
+        if args != process_utils.PS_COMMAND:
+            return popen(args, *popen_args, **kwargs)
+
+        ps_runs[0] += 1
+        return FakePsProcess(make_ps_output(processes))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        proc_dir = os.path.join(tmp_dir, 'proc')
+        if source == 'proc':
+            make_proc_dir(processes, proc_dir)
+
+        with mock.patch.object(process_utils, 'PROC_DIR', proc_dir), mock.patch.object(
+            process_utils.subprocess, 'Popen', fake_popen
+        ):
+            yield ps_runs
+
+
+def measure(
+    make_server: Callable[[], FakeServer],
+    run: Callable[[FakeServer], None],
+    ps_runs: List[int],
+    repeat: int,
+    prepare: Optional[Callable[[FakeServer], None]] = None,
+):
+    """Run on a new server (and cold names cache and layout fingerprints) each time, keep the fastest run
+
+    Args:
+        prepare (Optional[Callable[[FakeServer], None]]): run before each measured run, not counted
+    """
+    best = None
+    for _ in range(repeat):
+        server = make_server()
+        # $TMUX of the hooks run-shell jobs, the runtime files (E.g: the layout fingerprints) go next to its socket
+        with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.object(
+            rename_session_windows, 'NAME_CACHE', name_cache.NameCache(0)
+        ), mock.patch.dict(os.environ, {'TMUX': f'{os.path.join(tmp_dir, "default")},1,0'}):
+            if prepare is not None:
+                prepare(server)
+            server.invocations = server.commands = 0
+            ps_runs[0] = 0
+
+            start = time.perf_counter()
+            run(server)
+            wall_ms = (time.perf_counter() - start) * 1000
+
+        result = Result(round(wall_ms, 3), server.commands, server.invocations, server.invocations + ps_runs[0])
+        if best is None or result.wall_ms < best.wall_ms:
+            best = result
+
+    return best
+
+
+def run_benchmarks(windows: List[int], processes: List[int], sources: List[str], repeat: int) -> Dict[str, Result]:
+    results = {}
+    for windows_count in windows:
+        for processes_count in processes:
+            scenario = Scenario(windows_count, processes_count)
+            for source in sources:
+                with process_table(scenario, source) as ps_runs:
+
+                    def run_rename_windows(server: FakeServer):
+                        rename_windows(server, Options.from_options(server), all_sessions=True)
+
+                    def run_post_restore(server: FakeServer):
+                        post_restore(server, Options.from_options(server))
+
+                    def run_get_panes_programs(server: FakeServer):
+                        get_panes_programs(server, Options().compile(), all_sessions=True)
+
+                    panes = [
+                        Pane(p.info, None)
+                        for p in get_panes_programs(scenario.make_server(), Options(), all_sessions=True)
+                    ]
+
+                    def run_get_exclusive_paths(_: FakeServer, panes: List[Pane] = panes):
+                        get_exclusive_paths(panes, False)
+
+                    for name, run, prepare in [
+                        ('rename_windows', run_rename_windows, None),
+                        # Again on unchanged windows, exits on the layout fingerprints (with /proc)
+                        ('rename_windows_unchanged', run_rename_windows, run_rename_windows),
+                        # After a restore (E.g: tmux-resurrect) of all the windows
+                        ('post_restore', run_post_restore, None),
+                        ('get_panes_programs', run_get_panes_programs, None),
+                        ('get_exclusive_paths', run_get_exclusive_paths, None),
+                    ]:
+                        key = f'{name}/w{windows_count}-p{processes_count}/{source}'
+                        results[key] = measure(scenario.make_server, run, ps_runs, repeat, prepare)
+                        print(f'{key:45} {results[key]}', file=sys.stderr)
+
+    return results
+
+
+def check_results(
+    results: Dict[str, Result], baselines: Dict[str, Dict], tolerance: Optional[float] = None
+) -> List[str]:
+    """Compare the results to the baselines
+
+    Args:
+        tolerance (Optional[float]): allowed wall time slowdown, None to compare only the counters
+            (the baselines wall times are from the machine that saved them)
+
+    Returns:
+        Regressions, more tmux commands or subprocesses than the baseline, or slower by more than `tolerance` times
+    """
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+
+        for counter in ('tmux_commands', 'tmux_invocations', 'subprocesses'):
+            if getattr(result, counter) > baseline[counter]:
+                regressions.append(f'{key}: {counter} {getattr(result, counter)} > {baseline[counter]}')
+
+        if tolerance is not None and result.wall_ms > baseline['wall_ms'] * tolerance:
+            regressions.append(f'{key}: wall_ms {result.wall_ms} > {baseline["wall_ms"]} * {tolerance}')
+
+    return regressions
+
+
+def main():
+    parser = ArgumentParser('bench_rename.py')
+    parser.add_argument('--windows', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--processes', type=int, nargs='+', default=[100, 10000])
+    parser.add_argument('--process_source', choices=PROCESS_SOURCES, nargs='+', default=PROCESS_SOURCES)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of each benchmark, the fastest is reported')
+    parser.add_argument('--baselines', default=BASELINES_FILE)
+    parser.add_argument('--save', action='store_true', help='Save the results as the baselines')
+    parser.add_argument('--check', action='store_true', help='Fail on regressions compared to the baselines')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        help='Allowed wall time slowdown for --check (E.g: 2), wall times are compared only with it',
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.windows, args.processes, args.process_source, args.repeat)
+    print(json.dumps({key: asdict(result) for key, result in results.items()}, indent=2))
+
+    if args.save:
+        baselines = {}
+        if os.path.exists(args.baselines):
+            with open(args.baselines) as f:
+                baselines = json.load(f)
+        baselines.update((key, asdict(result)) for key, result in results.items())
+        with open(args.baselines, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if args.check:
+        with open(args.baselines) as f:
+            regressions = check_results(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
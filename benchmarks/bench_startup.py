@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+# Startup benchmark: import time of the entry points (`python -X importtime`) against a startup budget.
+# Usage: benchmarks/bench_startup.py [--repeat 5] [--top 10] [--check]
+
+import os
+import re
+import subprocess
+import sys
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from typing import Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCHMARKS_DIR, '..', 'scripts')
+
+# Import time budgets of the entry points, with cached byte code
+STARTUP_BUDGETS_MS = {
+    'rename': 40,  # Hook management subcommands
+    'rename_session_windows': 120,  # Rename, before libtmux is imported
+}
+# Modules the entry points must not import at startup
+DEFERRED_MODULES = {
+    'rename': ['rename_session_windows', 'libtmux'],
+    'rename_session_windows': ['libtmux', 'logging.config', 'socket', 'tmux_events', 'pane_watcher'],
+}
+# import time: <self us> | <cumulative us> | <indented module>
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+@dataclass
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportTime]:
+    """Parse the `-X importtime` report, modules are listed after the modules they imported"""
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is not None:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append(ImportTime(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+
+    return imports
+
+
+def measure_imports(module: str, repeat: int) -> List[ImportTime]:
+    """Import the module in new interpreters, keep the fastest run
+
+    The first run writes the byte code cache, like a plugin that already ran once.
+    """
+    env = {key: value for key, value in os.environ.items() if key != 'PYTHONDONTWRITEBYTECODE'}
+    command = [sys.executable, '-X', 'importtime', '-c', f'import {module}']
+
+    best: List[ImportTime] = []
+    for _ in range(repeat + 1):
+        process = subprocess.run(command, cwd=SCRIPTS_DIR, env=env, stderr=subprocess.PIPE, text=True, check=True)
+        imports = parse_importtime(process.stderr)
+        if len(best) == 0 or get_total_us(imports, module) < get_total_us(best, module):
+            best = imports
+
+    return best
+
+
+def get_total_us(imports: List[ImportTime], module: str) -> int:
+    return next(i.cumulative_us for i in imports if i.module == module and i.depth == 0)
+
+
+def format_report(module: str, imports: List[ImportTime], top: int) -> str:
+    """Format the total import time of the module and its slowest imports (by cumulative time)
+
+    E.g:
+        rename_session_windows  41.2 ms (budget 120 ms)
+            14.0 ms  json
+             9.1 ms  dataclasses
+    """
+    total_ms = get_total_us(imports, module) / 1000
+    lines = [f'{module:24} {total_ms:5.1f} ms (budget {STARTUP_BUDGETS_MS[module]} ms)']
+    slowest = sorted((i for i in imports if i.module != module), key=lambda i: i.cumulative_us, reverse=True)
+    lines += [f'  {i.cumulative_us / 1000:7.1f} ms  {"  " * (i.depth - 1)}{i.module}' for i in slowest[:top]]
+    return '\n'.join(lines)
+
+
+def check_startup(imports_by_module: Dict[str, List[ImportTime]]) -> List[str]:
+    """Get the entry points over their budget or that imported a deferred module"""
+    regressions = []
+    for module, imports in imports_by_module.items():
+        total_ms = get_total_us(imports, module) / 1000
+        if total_ms > STARTUP_BUDGETS_MS[module]:
+            regressions.append(f'{module}: import time {total_ms:.1f} ms > {STARTUP_BUDGETS_MS[module]} ms')
+
+        imported = {i.module for i in imports}
+        for deferred in DEFERRED_MODULES[module]:
+            if deferred in imported:
+                regressions.append(f'{module}: imports {deferred} at startup')
+
+    return regressions
+
+
+def main():
+    parser = ArgumentParser('bench_startup.py')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each entry point, the fastest is reported')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to report')
+    parser.add_argument('--check', action='store_true', help='Fail on startup budget overruns and deferred imports')
+    args = parser.parse_args()
+
+    imports_by_module = {module: measure_imports(module, args.repeat) for module in STARTUP_BUDGETS_MS}
+    for module, imports in imports_by_module.items():
+        print(format_report(module, imports, args.top))
+
+    if args.check:
+        regressions = check_startup(imports_by_module)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
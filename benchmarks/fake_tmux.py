@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from tmux_transport import CmdResult
+
+FORMAT_VARIABLE = re.compile(r'#\{([^}]+)\}')
+
+PROGRAMS = [
+    None,  # Shell only
+    'nvim README.md',
+    'git diff',
+    'python3 -m http.server',
+    'htop',
+    None,
+    'less /var/log/syslog',
+    '/usr/bin/ssh host',
+]
+DIRS = ['src', 'tests', 'docs']
+WINDOWS_PER_SESSION = 10
+SHELL_PID_START = 10000
+PROGRAM_PID_START = 100000
+OTHER_PID_START = 200000
+
+
+@dataclass
+class FakePane:
+    pane_id: str
+    pane_pid: int
+    pane_active: bool
+    pane_current_path: str
+    pane_current_command: str
+
+
+@dataclass
+class FakeWindow:
+    window_id: str
+    window_name: str
+    panes: List[FakePane]
+    options: Dict[str, str] = field(default_factory=lambda: {'automatic-rename': '1'})
+
+
+@dataclass
+class FakeSession:
+    session_id: str
+    windows: List[FakeWindow]
+
+
+@dataclass
+class Process:
+    pid: int
+    ppid: int
+    cmdline: List[str]
+
+
+class FakeServer:
+    """
+    A tmux server in memory, answering the tmux commands of the plugin (same `cmd` interface as libtmux Server).
+
+    Counts the tmux invocations (a `cmd` call starts a tmux client) and the tmux commands (chained commands included).
+    """
+
+    def __init__(self, sessions: List[FakeSession]):
+        self.sessions = sessions
+        self.windows = {window.window_id: window for session in sessions for window in session.windows}
+        self.global_options: Dict[str, str] = {}
+        self.invocations = 0
+        self.commands = 0
+
+    def is_alive(self) -> bool:
+        return True
+
+    def cmd(self, *args: Any) -> CmdResult:
+        self.invocations += 1
+        result = CmdResult([str(arg) for arg in args])
+
+        command: List[str] = []
+        for arg in [*result.cmd, ';']:
+            if arg != ';':
+                command.append(arg[:-2] + ';' if arg.endswith('\\;') else arg)
+                continue
+
+            self.commands += 1
+            output = self._run(command)
+            if output is None:
+                result.returncode = 1
+                result.stderr = [f'unknown command: {command}']
+                break
+            result.stdout += output
+            command = []
+
+        return result
+
+    def _run(self, command: List[str]) -> Optional[List[str]]:
+        name, args = command[0], command[1:]
+        target = args[args.index('-t') + 1] if '-t' in args else None
+
+        if name == 'show-options':
+            return [f'{option} {value}' for option, value in sorted(self.global_options.items())]
+        if name == 'show-option':
+            value = self.global_options.get(args[-1])
+            return [] if value is None else [value]
+        if name == 'set-option':
+            if '-g' in args:
+                self.global_options[args[-2]] = args[-1]
+            elif target in self.windows:
+                self.windows[target].options[args[-2]] = '1' if args[-1] == 'on' else args[-1]
+            return []
+        if name == 'set-hook':
+            return []
+        if name == 'rename-window':
+            if target not in self.windows:
+                return None
+            self.windows[target].window_name = args[-1]
+            return []
+        if name == 'list-panes':
+            return [
+                self._format(args[args.index('-F') + 1], session, window, pane)
+                for session in self._target_sessions(args, target)
+                for window in session.windows
+                for pane in window.panes
+            ]
+        if name == 'list-windows':
+            return [
+                self._format(args[args.index('-F') + 1], session, window, None)
+                for session in self._target_sessions(args, target)
+                for window in session.windows
+            ]
+        if name == 'display-message':
+            return [self._format(args[-1], self.sessions[0], self.sessions[0].windows[0], None)]
+
+        return None
+
+    def _target_sessions(self, args: List[str], target: Optional[str]) -> List[FakeSession]:
+        if '-a' in args:
+            return self.sessions
+        # The first session is the current session
+        return [session for session in self.sessions if session.session_id == (target or self.sessions[0].session_id)]
+
+    def _format(self, fmt: str, session: FakeSession, window: FakeWindow, pane: Optional[FakePane]) -> str:
+        values: Dict[str, Any] = {'session_id': session.session_id, 'socket_path': '/tmp/tmux-fake/default'}
+        values.update(window_id=window.window_id, window_name=window.window_name, **window.options)
+        if pane is not None:
+            values.update(pane.__dict__)
+            values['pane_active'] = int(pane.pane_active)
+        return FORMAT_VARIABLE.sub(lambda match: str(values.get(match.group(1), '')), fmt)
+
+
+@dataclass
+class Scenario:
+    """Sessions of `windows` windows (2 panes each) and a process table of `processes` processes"""
+
+    windows: int
+    processes: int
+
+    def make_server(self) -> FakeServer:
+        sessions = []
+        for i in range(self.windows):
+            if i % WINDOWS_PER_SESSION == 0:
+                sessions.append(FakeSession(f'${len(sessions)}', []))
+
+            # Directories shared between windows, with common parents
+            path = f'/home/user/project{i % (self.windows // 3 + 1)}/{DIRS[i % len(DIRS)]}'
+            program = PROGRAMS[i % len(PROGRAMS)]
+            panes = [
+                FakePane(f'%{2 * i}', SHELL_PID_START + 2 * i, True, path, (program or 'zsh').split()[0]),
+                FakePane(f'%{2 * i + 1}', SHELL_PID_START + 2 * i + 1, False, '/home/user', 'zsh'),
+            ]
+            sessions[-1].windows.append(FakeWindow(f'@{i}', 'zsh', panes))
+
+        return FakeServer(sessions)
+
+    def make_processes(self) -> List[Process]:
+        processes = []
+        for i in range(self.windows):
+            for pane_index in range(2):
+                processes.append(Process(SHELL_PID_START + 2 * i + pane_index, 1, ['-zsh']))
+
+            program = PROGRAMS[i % len(PROGRAMS)]
+            if program is not None:
+                processes.append(Process(PROGRAM_PID_START + i, SHELL_PID_START + 2 * i, program.split()))
+
+        # Unrelated processes of the system
+        for i in range(max(self.processes - len(processes), 0)):
+            processes.append(Process(OTHER_PID_START + i, 1, ['worker', '--id', str(i)]))
+
+        return processes
+
+
+def make_ps_output(processes: List[Process]) -> bytes:
+    """Same as `ps -a -oppid,command`"""
+    lines = ['PPID COMMAND'] + [f'{process.ppid:5} {" ".join(process.cmdline)}' for process in processes]
+    return '\n'.join(lines).encode() + b'\n'
+
+
+class FakePsProcess:
+    """A finished `ps` process (same interface as the Popen of process_utils.start_ps)"""
+
+    def __init__(self, output: bytes):
+        self.output = output
+        self.returncode = 0
+
+    def communicate(self) -> Tuple[bytes, None]:
+        return self.output, None
+
+    def __enter__(self) -> 'FakePsProcess':
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+def make_proc_dir(processes: List[Process], proc_dir: str):
+    """Write a /proc tree with the stat, cmdline and children files of the processes"""
+    children: Dict[int, List[int]] = {}
+    for process in processes:
+        children.setdefault(process.ppid, []).append(process.pid)
+
+    os.makedirs(os.path.join(proc_dir, 'self', 'task'))
+    for process in processes:
+        task_dir = os.path.join(proc_dir, str(process.pid), 'task', str(process.pid))
+        os.makedirs(task_dir)
+        with open(os.path.join(task_dir, 'children'), 'w') as f:
+            f.write(''.join(f'{child} ' for child in children.get(process.pid, [])))
+
+        with open(os.path.join(proc_dir, str(process.pid), 'cmdline'), 'wb') as f:
+            f.write(b'\0'.join(arg.encode() for arg in process.cmdline) + b'\0')
+
+        # state ppid pgrp session tty_nr tpgid ... starttime (20th field after the command name)
+        fields = ['S', process.ppid, process.pid, process.pid, 0, -1] + [0] * 13 + [process.pid]
+        with open(os.path.join(proc_dir, str(process.pid), 'stat'), 'w') as f:
+            f.write(f'{process.pid} ({process.cmdline[0][:15]}) {" ".join(str(x) for x in fields)}\n')
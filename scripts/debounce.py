@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import os
+import time
+from typing import Callable, Optional
+
+
+def trigger(trigger_path: str) -> str:
+    """Record a new trigger, replacing the previous one
+
+    Returns:
+        Token of the new trigger
+    """
+    token = f'{os.getpid()}-{time.time_ns()}'
+    tmp_path = f'{trigger_path}.{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        f.write(token)
+    os.replace(tmp_path, trigger_path)
+    return token
+
+
+def last_trigger(trigger_path: str) -> Optional[str]:
+    try:
+        with open(trigger_path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def wait_quiet_period(trigger_path: str, token: str, quiet_period: float) -> bool:
+    """Wait for the quiet period
+
+    Returns:
+        True if there was no newer trigger meanwhile
+    """
+    time.sleep(quiet_period)
+    return last_trigger(trigger_path) == token
+
+
+def debounce(trigger_path: str, quiet_period: float, run: Callable[[], None]) -> bool:
+    """Run only if no other trigger came in the quiet period after this one (the last trigger of a burst runs)
+
+    Args:
+        trigger_path (str): file shared by all the triggers
+        quiet_period (float): seconds to wait for newer triggers
+        run (Callable[[], None]): the debounced work
+
+    Returns:
+        True if ran
+    """
+    token = trigger(trigger_path)
+    if not wait_quiet_period(trigger_path, token, quiet_period):
+        return False
+
+    # A trigger during the run runs in its own process, after its quiet period (the rename lock serializes them)
+    run()
+    return True
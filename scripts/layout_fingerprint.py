@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+from process_utils import ProgramsFingerprint
+from tmux_snapshot import PaneInfo
+
+# Sessions kept in the fingerprints file, the least recently renamed are dropped
+MAX_LAYOUT_FINGERPRINTS = 256
+
+
+def get_layout_fingerprints(
+    panes: List[PaneInfo],
+    programs_fingerprints: Dict[int, ProgramsFingerprint],
+    options_hash: str,
+    renames: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """Get a fingerprint of the windows of each session, the names of a session depend only on it
+
+    Hashes the active panes (ids, pids, programs, directories), the windows names and enabled state
+    and the options hash. automatic-rename isn't included, the renames turn it on.
+
+    Args:
+        renames (Optional[Dict[str, str]]): new names of the renamed windows, instead of their listed names
+
+    Returns:
+        Dict of session id to its fingerprint
+    """
+    renames = renames or {}
+    sessions_panes: Dict[str, list] = {}
+    for p in panes:
+        if p.pane_active:
+            sessions_panes.setdefault(p.session_id, []).append(
+                (
+                    p.window_id,
+                    p.pane_id,
+                    p.pane_pid,
+                    p.pane_current_path,
+                    p.pane_current_command,
+                    renames.get(p.window_id, p.window_name),
+                    p.window_enabled,
+                    programs_fingerprints.get(p.pane_pid) if p.pane_pid is not None else None,
+                )
+            )
+
+    return {
+        session_id: hashlib.sha1(repr((options_hash, session_panes)).encode()).hexdigest()
+        for session_id, session_panes in sessions_panes.items()
+    }
+
+
+def load_layout_fingerprints(path: str) -> Dict[str, str]:
+    """Load the fingerprints saved after the previous renames, empty if there are none"""
+    try:
+        # Only trust our own fingerprints
+        if os.stat(path).st_uid != os.getuid():
+            return {}
+
+        with open(path) as f:
+            fingerprints = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    return fingerprints if isinstance(fingerprints, dict) else {}
+
+
+def save_layout_fingerprints(path: str, fingerprints: Dict[str, str], previous: Optional[Dict[str, str]] = None):
+    """Save the fingerprints of the renamed sessions, on top of the previous fingerprints of the other sessions"""
+    merged = dict(previous or {})
+    for key, fingerprint in fingerprints.items():
+        # Most recently renamed last
+        merged.pop(key, None)
+        merged[key] = fingerprint
+    merged = dict(list(merged.items())[-MAX_LAYOUT_FINGERPRINTS:])
+
+    tmp_path = f'{path}.{os.getpid()}'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(merged, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # The next run renames again
+        logging.debug('failed to save layout fingerprints', exc_info=True)
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Tuple
+
+CacheKey = Tuple[Hashable, ...]
+
+
+class NameCache:
+    """
+    Bounded LRU cache of resolved window names, the keys include the options hash so changed options miss the cache.
+
+    Values must be json serializable to save the cache to a file.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: 'OrderedDict[CacheKey, Any]' = OrderedDict()
+        self.changed = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_or_compute(self, key: CacheKey, compute: Callable[[], Any]) -> Any:
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        value = compute()
+        if self.max_size > 0:
+            self.entries[key] = value
+            self.changed = True
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        return value
+
+    def load(self, path: str):
+        """Add the entries saved to a file, least recently used first"""
+        if self.max_size <= 0:
+            return
+
+        try:
+            # Only trust our own cache
+            if os.stat(path).st_uid != os.getuid():
+                return
+
+            with open(path) as f:
+                entries = [(tuple(key), value) for key, value in json.load(f)]
+
+            for key, value in entries[-self.max_size :]:
+                self.entries[key] = value
+        except (OSError, TypeError, ValueError):
+            # Corrupted cache, entries are computed again
+            return
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def save(self, path: str):
+        if not self.changed:
+            return
+
+        tmp_path = f'{path}.{os.getpid()}'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump([[key, value] for key, value in self.entries.items()], f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            logging.debug('failed to save name cache', exc_info=True)
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self.changed = False
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import os
+from typing import Dict, Set
+
+from process_utils import ProgramsFingerprint
+
+BACKOFF = 2
+
+
+def get_cpu_time() -> float:
+    """CPU seconds used by this process and its waited children (the tmux clients it ran)"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def get_changed_pids(
+    old_fingerprints: Dict[int, ProgramsFingerprint], new_fingerprints: Dict[int, ProgramsFingerprint]
+) -> Set[int]:
+    """Get the pids whose programs changed, pids that weren't sampled before aren't changes"""
+    return {
+        pid
+        for pid, fingerprint in new_fingerprints.items()
+        if pid in old_fingerprints and old_fingerprints[pid] != fingerprint
+    }
+
+
+class AdaptiveInterval:
+    """
+    Sampling interval of the watcher, the minimum right after activity, backing off exponentially when idle.
+
+    The interval is stretched to keep the CPU time of the watcher under `cpu_budget` (fraction of one CPU),
+    even above `max_interval`.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, cpu_budget: float):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cpu_budget = cpu_budget
+        self.interval = min_interval
+
+    def update(self, active: bool, cpu_cost: float) -> float:
+        """Get the time to sleep before the next sample
+
+        Args:
+            active (bool): the last sample found changes
+            cpu_cost (float): CPU seconds the last sample took
+        """
+        if active:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * BACKOFF, self.max_interval)
+
+        if self.cpu_budget <= 0:
+            return self.interval
+
+        # cpu_cost / (cpu_cost + sleep) <= cpu_budget
+        return max(self.interval, cpu_cost / self.cpu_budget - cpu_cost)
@@ -1,28 +1,53 @@
 #!/usr/bin/env python3
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from libtmux.pane import Pane as TmuxPane
+from tmux_snapshot import PaneInfo
 
 
 @dataclass
 class Pane:
-    info: TmuxPane
+    info: PaneInfo
     program: Optional[str]  # None when no program is running
 
 
 @dataclass
-class DisplayedPath:
-    pane: Pane
-    full: Path
-    display: Path
+class PathTrieNode:
+    count: int = 0  # Number of distinct paths ending with the parts leading to the node
+    children: Dict[str, 'PathTrieNode'] = field(default_factory=dict)
 
-    @staticmethod
-    def from_pane(pane: Pane):
-        path = Path(str(pane.info.pane_current_path))
-        return DisplayedPath(pane, path, Path(path.name))
+
+def build_path_trie(paths: Iterable[Tuple[str, ...]]) -> PathTrieNode:
+    """Build a trie of the reversed parts of distinct paths
+
+    E.g:
+        [('a', 'dir'), ('b', 'dir')] -> dir(2) -> a(1), b(1)
+    """
+    root = PathTrieNode()
+    for parts in paths:
+        node = root
+        for part in reversed(parts):
+            node = node.children.setdefault(part, PathTrieNode())
+            node.count += 1
+
+    return root
+
+
+def get_unique_suffix_length(root: PathTrieNode, parts: Tuple[str, ...]) -> int:
+    """Get the number of last parts telling a path of the trie apart from the other paths
+
+    Returns:
+        Length of the shortest unique suffix, all the parts if the path is a suffix of another path
+    """
+    node = root
+    for length, part in enumerate(reversed(parts), 1):
+        node = node.children[part]
+        if node.count == 1:
+            return length
+
+    return len(parts)
 
 
 def get_uncommon_path(a: Path, b: Path) -> Tuple[Path, Path]:
@@ -54,42 +79,31 @@ def get_uncommon_path(a: Path, b: Path) -> Tuple[Path, Path]:
 def get_exclusive_paths(panes: List[Pane], ignore_program_diffs: bool) -> List[Tuple[Pane, Path]]:
     """Get exclusive path for each pane (better explaining in the README)
 
+    Each pane gets the shortest suffix of its path that no other path of the same program has,
+    in O(total path parts) with a trie of the reversed paths.
+
     Args:
         panes (List[Pane]): list of the panes
+        ignore_program_diffs (bool): tell apart the paths of all the panes, not only of the same program
 
     Returns:
         List of tuples with the original pane and display path
     """
-    # Start all displays as the last dir (.name)
-    exc_paths = [DisplayedPath.from_pane(pane) for pane in panes]
-
-    for x in range(len(exc_paths)):
-        intersected_paths = []
-        same_paths_different_programs = []
-        for y in range(len(exc_paths)):
-            if x == y:
-                continue
-
-            # If different programs dont change display path
-            if panes[x].program != panes[y].program:
-                if not ignore_program_diffs:
-                    continue
-
-            # If full path equals no need to find a display path
-            if exc_paths[x].full == exc_paths[y].full:
-                same_paths_different_programs.append(y)
-                continue
-
-            # If display not the same dont find new one
-            if exc_paths[x].display != exc_paths[y].display:
-                continue
+    paths = [Path(str(pane.info.pane_current_path)).parts for pane in panes]
 
-            intersected_paths.append(y)
+    # Panes of different programs are told apart by the program
+    groups: Dict[Optional[str], List[int]] = {}
+    for i, pane in enumerate(panes):
+        groups.setdefault(None if ignore_program_diffs else pane.program, []).append(i)
 
-        for y in intersected_paths:
-            exc_paths[x].display, exc_paths[y].display = get_uncommon_path(exc_paths[x].full, exc_paths[y].full)
+    displays: List[Path] = [Path()] * len(panes)
+    for group in groups.values():
+        # Same paths get the same display
+        group_paths = {paths[i] for i in group}
+        trie = build_path_trie(group_paths)
+        suffix_lengths = {parts: get_unique_suffix_length(trie, parts) for parts in group_paths}
 
-            for same_path in same_paths_different_programs:
-                exc_paths[same_path].display = exc_paths[x].display
+        for i in group:
+            displays[i] = Path(*paths[i][len(paths[i]) - suffix_lengths[paths[i]] :])
 
-    return [(p.pane, p.display) for p in exc_paths]
+    return list(zip(panes, displays))
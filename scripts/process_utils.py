@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import subprocess
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Parent pid -> command lines of its children (argv joined with spaces, same as `ps -ocommand`)
+RunningPrograms = Dict[int, List[bytes]]
+# Identifies the programs of a pid without reading their command lines, (pid, start time) of each program
+ProgramsFingerprint = Tuple[Any, ...]
+
+PROC_DIR = '/proc'
+PS_COMMAND = ['ps', '-a', '-oppid,command']
+
+
+def is_proc_available() -> bool:
+    """Check if the processes can be read from /proc (with the children of each task)"""
+    return os.path.isdir(f'{PROC_DIR}/self/task')
+
+
+def parse_ps_output(output: bytes) -> RunningPrograms:
+    """Parse `ps -oppid,command` output, defunct processes are skipped
+
+    E.g:
+        b'PPID COMMAND\\n  10 nvim file\\n' -> {10: [b'nvim file']}
+    """
+    running_programs: RunningPrograms = {}
+    for line in output.splitlines()[1:]:
+        if b'<defunct>' in line:
+            continue
+
+        parts = line.split(maxsplit=1)
+        if len(parts) != 2:
+            continue
+
+        running_programs.setdefault(int(parts[0]), []).append(parts[1])
+
+    return running_programs
+
+
+def start_ps() -> subprocess.Popen:
+    """Start `ps` without waiting for it, its output is read by read_ps"""
+    return subprocess.Popen(PS_COMMAND, stdout=subprocess.PIPE)
+
+
+def read_ps(process: subprocess.Popen) -> RunningPrograms:
+    output_bytes, _ = process.communicate()
+    # can occur if ps has empty output
+    if process.returncode != 0:
+        logging.warning('nothing returned from `ps -a -oppid,command`')
+        return {}
+
+    running_programs = parse_ps_output(output_bytes)
+    logging.debug(f'running_programs={running_programs}')
+    return running_programs
+
+
+def get_running_programs_ps() -> RunningPrograms:
+    with start_ps() as process:
+        return read_ps(process)
+
+
+def read_proc_cmdline(pid: int) -> Optional[bytes]:
+    """Get the command line of a process, None if it exited or is a zombie"""
+    try:
+        with open(f'{PROC_DIR}/{pid}/cmdline', 'rb') as f:
+            cmdline = f.read()
+    except OSError:
+        return None
+
+    if len(cmdline) == 0:
+        return None
+
+    return b' '.join(cmdline.rstrip(b'\0').split(b'\0'))
+
+
+def read_proc_children(pid: int) -> Optional[List[int]]:
+    """Get the children of a process from /proc/<pid>/task/*/children
+
+    Returns:
+        None if the kernel doesn't provide the children files (CONFIG_PROC_CHILDREN)
+    """
+    try:
+        tids = os.listdir(f'{PROC_DIR}/{pid}/task')
+    except OSError:
+        return []
+
+    children = []
+    for tid in tids:
+        try:
+            with open(f'{PROC_DIR}/{pid}/task/{tid}/children') as f:
+                children += [int(child) for child in f.read().split()]
+        except FileNotFoundError:
+            if not os.path.exists(f'{PROC_DIR}/{pid}/task/{tid}'):
+                # Thread exited
+                continue
+            return None
+        except OSError:
+            continue
+
+    return children
+
+
+def read_proc_ppid_index() -> Dict[int, List[int]]:
+    """Build a parent pid -> children pids index from /proc/<pid>/stat of every process"""
+    index: Dict[int, List[int]] = {}
+    for entry in os.listdir(PROC_DIR):
+        if not entry.isdigit():
+            continue
+
+        stat = read_proc_stat(int(entry))
+        if stat is None:
+            continue
+
+        state, ppid = stat[:2]
+        if state == b'Z':
+            continue
+
+        index.setdefault(int(ppid), []).append(int(entry))
+
+    return index
+
+
+def get_running_programs_proc(pids: Iterable[int]) -> RunningPrograms:
+    """Get the children command lines of `pids` from /proc, reading only those processes"""
+    pids = list(pids)
+    children: Dict[int, List[int]] = {}
+    for pid in pids:
+        pid_children = read_proc_children(pid)
+        if pid_children is None:
+            # No children files, index all the processes parents once
+            ppid_index = read_proc_ppid_index()
+            children = {pid: ppid_index.get(pid, []) for pid in pids}
+            break
+        children[pid] = pid_children
+
+    running_programs: RunningPrograms = {}
+    for pid, pid_children in children.items():
+        # Same order as ps
+        for child in sorted(pid_children):
+            cmdline = read_proc_cmdline(child)
+            if cmdline is not None:
+                running_programs.setdefault(pid, []).append(cmdline)
+
+    logging.debug(f'running_programs={running_programs}')
+    return running_programs
+
+
+def read_proc_stat(pid: int) -> Optional[List[bytes]]:
+    """Get the /proc/<pid>/stat fields after the command name, starting with the state"""
+    try:
+        with open(f'{PROC_DIR}/{pid}/stat', 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return None
+
+    # The command name can contain spaces and parentheses, the fields after it can't
+    return stat[stat.rfind(b')') + 2 :].split()
+
+
+def read_proc_start_time(pid: int) -> Optional[int]:
+    """Get the start time of a process in clock ticks after boot, tells apart processes reusing a pid"""
+    stat = read_proc_stat(pid)
+    if stat is None:
+        return None
+
+    return int(stat[19])
+
+
+def read_proc_tpgid(pid: int) -> Optional[int]:
+    """Get the foreground process group of the terminal of a process, from /proc/<pid>/stat"""
+    stat = read_proc_stat(pid)
+    if stat is None:
+        return None
+
+    # Fields after the command name: state ppid pgrp session tty_nr tpgid
+    tpgid = int(stat[5])
+    if tpgid <= 0:
+        return None
+
+    return tpgid
+
+
+def get_foreground_programs_proc(pids: Iterable[int]) -> RunningPrograms:
+    """Get the command line of the foreground process group leader of each pid's terminal
+
+    Returns:
+        pid -> [leader command line], or [] if the pid itself is in the foreground (E.g: shell prompt).
+        pids that couldn't be resolved (no /proc, the leader exited) are left out
+    """
+    running_programs: RunningPrograms = {}
+    for pid in pids:
+        tpgid = read_proc_tpgid(pid)
+        if tpgid is None:
+            continue
+
+        if tpgid == pid:
+            running_programs[pid] = []
+            continue
+
+        cmdline = read_proc_cmdline(tpgid)
+        if cmdline is not None:
+            running_programs[pid] = [cmdline]
+
+    logging.debug(f'foreground programs={running_programs}')
+    return running_programs
+
+
+def get_running_programs(
+    pids: Iterable[int], foreground: bool = False, ps_programs: Optional[RunningPrograms] = None
+) -> RunningPrograms:
+    """Get the children command lines of `pids`, from /proc if available, otherwise from `ps`
+
+    Args:
+        pids (Iterable[int]): pids to get the children of
+        foreground (bool): get only the foreground process group leader of each pid's terminal,
+            falls back to the children for pids it can't resolve
+        ps_programs (Optional[RunningPrograms]): `ps` output already collected, `ps` runs if not given
+    """
+    pids = list(pids)
+    running_programs: RunningPrograms = {}
+    if foreground and os.path.isdir(PROC_DIR):
+        running_programs = get_foreground_programs_proc(pids)
+        pids = [pid for pid in pids if pid not in running_programs]
+        if len(pids) == 0:
+            return running_programs
+
+    if is_proc_available():
+        children = get_running_programs_proc(pids)
+    else:
+        children = get_running_programs_ps() if ps_programs is None else ps_programs
+
+    # ps lists every process, keep the foreground programs already resolved
+    running_programs.update((pid, children[pid]) for pid in pids if pid in children)
+    return running_programs
+
+
+def get_programs_fingerprints(pids: Iterable[int], foreground: bool = False) -> Dict[int, ProgramsFingerprint]:
+    """Get a fingerprint of the programs of each pid, changes when a program starts or exits
+
+    Reads only the stat files of the programs from /proc, without /proc the command lines are compared instead
+
+    Args:
+        pids (Iterable[int]): pids to get the programs of
+        foreground (bool): fingerprint only the foreground process group leader of each pid's terminal
+    """
+    pids = list(pids)
+    if not is_proc_available():
+        running_programs = get_running_programs(pids, foreground)
+        return {pid: tuple(running_programs.get(pid, [])) for pid in pids}
+
+    programs: Dict[int, List[int]] = {}
+    children_pids = []
+    for pid in pids:
+        tpgid = read_proc_tpgid(pid) if foreground else None
+        if tpgid is not None:
+            programs[pid] = [] if tpgid == pid else [tpgid]
+        else:
+            children_pids.append(pid)
+
+    for pid in children_pids:
+        pid_children = read_proc_children(pid)
+        if pid_children is None:
+            # No children files, index all the processes parents once
+            ppid_index = read_proc_ppid_index()
+            programs.update((pid, ppid_index.get(pid, [])) for pid in children_pids)
+            break
+        programs[pid] = pid_children
+
+    return {
+        pid: tuple((program, read_proc_start_time(program)) for program in sorted(pid_programs))
+        for pid, pid_programs in programs.items()
+    }
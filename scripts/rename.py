@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+# Fast-start entry point of the plugin, same arguments as rename_session_windows.py.
+# The byte code of imported modules is cached (a script run directly is compiled on every run),
+# and the hook management subcommands return before libtmux and the options are loaded.
+
+import sys
+
+from rename_hook import TmuxClient, disable_user_rename_hook, enable_user_rename_hook
+
+HOOK_COMMANDS = {
+    '--enable_rename_hook': enable_user_rename_hook,
+    '--disable_rename_hook': disable_user_rename_hook,
+}
+
+
+def main():
+    if len(sys.argv) == 2 and sys.argv[1] in HOOK_COMMANDS:
+        HOOK_COMMANDS[sys.argv[1]](TmuxClient())
+        return
+
+    import rename_session_windows
+
+    rename_session_windows.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+# Hook client for the rename daemon, kept free of heavy imports so a hook costs a socket write.
+# Usage: rename_daemon.py rename [session_id] | reload | stop
+# Falls back to running rename.py when no daemon is listening
+
+import os
+import socket
+import stat
+import sys
+from typing import Callable, List, Optional
+
+RENAME_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rename.py')
+RECV_TIMEOUT = 60
+MAX_MESSAGE_SIZE = 4096
+
+
+def get_tmux_socket_path() -> Optional[str]:
+    """Get the tmux server socket path from $TMUX (set in panes and in run-shell jobs)"""
+    tmux_env = os.environ.get('TMUX')
+    if not tmux_env:
+        return None
+
+    return tmux_env.split(',')[0]
+
+
+def get_tmux_session_id() -> Optional[str]:
+    """Get the current session id from $TMUX (in run-shell jobs, the session of the hook)
+
+    E.g:
+        /tmp/tmux-1000/default,1234,2 -> $2
+    """
+    tmux_env_fields = os.environ.get('TMUX', '').split(',')
+    if len(tmux_env_fields) < 3 or not tmux_env_fields[2].isdigit():
+        return None
+
+    return f'${tmux_env_fields[2]}'
+
+
+def get_server_runtime_path(tmux_socket_path: str, name: str) -> str:
+    """Get a path for runtime files of a tmux server, in the directory of its socket (private to the user)
+
+    E.g:
+        /tmp/tmux-1000/default, sock -> /tmp/tmux-1000/tmux-window-name-default.sock
+    """
+    socket_dir, socket_name = os.path.split(tmux_socket_path)
+    return os.path.join(socket_dir, f'tmux-window-name-{socket_name}.{name}')
+
+
+def get_daemon_socket_path(tmux_socket_path: str) -> str:
+    """Get the daemon socket path, one daemon per tmux server"""
+    return get_server_runtime_path(tmux_socket_path, 'sock')
+
+
+def send_message(daemon_socket_path: str, message: str) -> bool:
+    """Send a message to the daemon
+
+    Returns:
+        True if the daemon received the message
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(message.encode(), daemon_socket_path)
+    except OSError:
+        return False
+
+    return True
+
+
+def is_daemon_alive(daemon_socket_path: str) -> bool:
+    return os.path.exists(daemon_socket_path) and send_message(daemon_socket_path, 'ping')
+
+
+def serve(
+    daemon_socket_path: str,
+    handle: Callable[[str], bool],
+    is_server_alive: Callable[[], bool],
+    get_quiet_period: Callable[[], float] = lambda: 0,
+):
+    """Receive messages until `handle` returns False or the tmux server is gone
+
+    Args:
+        daemon_socket_path (str): path to bind the daemon socket to
+        handle (Callable[[str], bool]): called with each message, returns False to stop the daemon
+        is_server_alive (Callable[[], bool]): checked on idle timeouts to exit with the tmux server
+        get_quiet_period (Callable[[], float]): seconds without messages to wait before handling a burst of
+            messages, duplicate messages in a burst are handled once
+    """
+    try:
+        if not stat.S_ISSOCK(os.lstat(daemon_socket_path).st_mode):
+            import logging
+
+            logging.warning(f'{daemon_socket_path} exists and is not a socket, not serving')
+            return
+
+        # Stale socket of a dead daemon
+        os.unlink(daemon_socket_path)
+    except FileNotFoundError:
+        pass
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.bind(daemon_socket_path)
+        os.chmod(daemon_socket_path, 0o600)
+
+        pending: List[str] = []
+        try:
+            while True:
+                sock.settimeout(get_quiet_period() if pending else RECV_TIMEOUT)
+                try:
+                    message = sock.recv(MAX_MESSAGE_SIZE).decode()
+                except socket.timeout:
+                    if pending:
+                        if not all(handle(pending_message) for pending_message in pending):
+                            return
+                        pending = []
+                        continue
+
+                    if not is_server_alive():
+                        return
+                    continue
+
+                if message == 'ping':
+                    continue
+
+                if get_quiet_period() <= 0:
+                    if not handle(message):
+                        return
+                    continue
+
+                if message in pending:
+                    pending.remove(message)
+                pending.append(message)
+        finally:
+            os.unlink(daemon_socket_path)
+
+
+def main():
+    message = ' '.join(sys.argv[1:]) or 'rename'
+    tmux_socket_path = get_tmux_socket_path()
+
+    if tmux_socket_path is not None and send_message(get_daemon_socket_path(tmux_socket_path), message):
+        return
+
+    command, *args = message.split()
+    if command != 'rename':
+        return
+
+    # No daemon, do the work in this process
+    argv = [RENAME_SCRIPT]
+    if args:
+        argv += ['--session_id', args[0]]
+    os.execv(RENAME_SCRIPT, argv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+# The after-rename-window hook that preserves the custom window names.
+# Kept free of heavy imports, enabling or disabling the hook doesn't need libtmux nor the options.
+
+import os
+import subprocess
+from typing import Any
+
+HOOK_INDEX = 8921
+# Fast-start entry point, run by the hook
+RENAME_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rename.py')
+
+
+class TmuxClient:
+    """Runs `cmd` with a new tmux client of the current server (the one in $TMUX), like libtmux Server"""
+
+    def cmd(self, *args: Any) -> subprocess.CompletedProcess:
+        return subprocess.run(['tmux', *(str(arg) for arg in args)], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def enable_user_rename_hook(server: Any):
+    """
+    The hook:
+        if window has name:
+            set @tmux_window_name_enabled to 1
+        else:
+            set @tmux_window_name_enabled to 0
+
+    @tmux_window_name_enabled (window option):
+        Indicator if we should rename the window or not
+    """
+    server.cmd(
+        'set-hook',
+        '-g',
+        f'after-rename-window[{HOOK_INDEX}]',
+        f'if-shell "[ #{{n:window_name}} -gt 0 ]" "set -w @tmux_window_name_enabled 0" "set -w @tmux_window_name_enabled 1; run-shell "{RENAME_SCRIPT}"',
+    )
+
+
+def disable_user_rename_hook(server: Any):
+    server.cmd('set-hook', '-ug', f'after-rename-window[{HOOK_INDEX}]')
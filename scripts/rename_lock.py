@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import fcntl
+import os
+from typing import IO, Callable, List, Optional
+
+# Target of the runs renaming every session, the other targets are session ids ('' for the current session)
+ALL_SESSIONS = '*'
+
+
+def open_no_follow(path: str, flags: int, mode: str) -> IO:
+    """Open a file without following a symlink at its path"""
+    return os.fdopen(os.open(path, flags | os.O_NOFOLLOW, 0o600), mode)
+
+
+def try_lock(lock_path: str) -> Optional[IO]:
+    """Lock a file without waiting, the lock is held until the returned file is closed (or the process exits)
+
+    The lock files are kept, removing a lock file would let two processes lock different files of the same path.
+
+    Returns:
+        None if another process holds the lock
+    """
+    lock_file = open_no_follow(lock_path, os.O_WRONLY | os.O_CREAT, 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+
+    return lock_file
+
+
+def add_waiting(waiting_path: str, target: str):
+    with open_no_follow(waiting_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(f'{target}\n')
+
+
+def take_waiting(waiting_path: str) -> List[str]:
+    """Get and clear the targets of the waiting runs"""
+    try:
+        f = open_no_follow(waiting_path, os.O_RDWR, 'r+')
+    except OSError:
+        return []
+
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        targets = f.read().splitlines()
+        f.truncate(0)
+
+    return targets
+
+
+def has_waiting(waiting_path: str) -> bool:
+    try:
+        return os.path.getsize(waiting_path) > 0
+    except OSError:
+        return False
+
+
+def merge_targets(targets: List[str]) -> str:
+    """Get one target for all the targets, the session they all target, otherwise all the sessions"""
+    unique_targets = set(targets)
+    return unique_targets.pop() if len(unique_targets) == 1 else ALL_SESSIONS
+
+
+def run_exclusive(lock_path: str, target: str, run: Callable[[str], None]) -> bool:
+    """Run alone among the runs sharing the lock
+
+    A run that finds the lock held records its target as waiting and returns, the holder runs once more for all the
+    waiting targets after its own run (one trailing run, the requests aren't dropped).
+    A holder that dies releases the lock with its process, the waiting targets are taken by the next run.
+
+    Returns:
+        True if ran
+    """
+    waiting_path = f'{lock_path}.waiting'
+    lock_file = try_lock(lock_path)
+    if lock_file is None:
+        add_waiting(waiting_path, target)
+        # The holder may have released the lock before our target was recorded
+        lock_file = try_lock(lock_path)
+        if lock_file is None:
+            return False
+
+    targets = [target]
+    while True:
+        with lock_file:
+            targets += take_waiting(waiting_path)
+            if len(targets) > 0:
+                run(merge_targets(targets))
+
+        # A run waiting from now on takes the released lock itself, check only the ones that waited until now
+        if not has_waiting(waiting_path):
+            return True
+
+        lock_file = try_lock(lock_path)
+        if lock_file is None:
+            return True
+        targets = []
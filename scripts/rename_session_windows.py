@@ -1,28 +1,62 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
+import time
+
+SCRIPT_START = time.perf_counter()
+
+# Modules needed only by some modes (libtmux, daemon, events, watcher) are imported where they are used
+import ast
+import hashlib
+import json
 import logging
-import logging.config
-import tempfile
-import subprocess
 import os
 import re
-from pathlib import Path
-from typing import Any, Iterator, List, Optional, Tuple
-from enum import Enum
-from dataclasses import dataclass, field
+import shlex
+import tempfile
 from argparse import ArgumentParser
-from contextlib import contextmanager
-
-from libtmux.server import Server
-from libtmux.session import Session
-from libtmux.pane import Pane as TmuxPane
-
-from path_utils import get_exclusive_paths, Pane
+from dataclasses import dataclass, field, fields, replace
+from enum import Enum
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+
+from layout_fingerprint import get_layout_fingerprints, load_layout_fingerprints, save_layout_fingerprints
+from name_cache import NameCache
+from path_utils import Pane, get_exclusive_paths
+from process_utils import (
+    ProgramsFingerprint,
+    RunningPrograms,
+    get_programs_fingerprints,
+    get_running_programs,
+    is_proc_available,
+)
+from rename_hook import TmuxClient, disable_user_rename_hook, enable_user_rename_hook
+from rename_lock import ALL_SESSIONS, run_exclusive, try_lock
+from snapshot_collector import Snapshot, collect_snapshot
+from substitute_rules import SubstituteRules
+from timings import TIMINGS
+from tmux_snapshot import PaneInfo, list_panes, list_windows_automatic_rename
+from tmux_transport import ControlModeServer, TmuxCommandBatch, get_attach_target
+
+if TYPE_CHECKING:
+    from libtmux.server import Server
 
 OPTIONS_PREFIX = '@tmux_window_name_'
-HOOK_INDEX = 8921
 HOME_DIR = os.path.expanduser('~')
 USR_BIN_REMOVER = (r'^(/usr)?/bin/(.+)', r'\g<2>')
+EVENTS_QUIET_PERIOD = 0.01
+WATCH_MIN_INTERVAL = 0.1
+WATCH_MAX_INTERVAL = 2
+WATCH_REFRESH_INTERVAL = 5  # Seconds between listing the panes to watch
+# Scripts of the plugin, skipped when they run in a pane
+SCRIPT_NAMES = ('scripts/rename_session_windows.py', 'scripts/rename.py', 'scripts/rename_daemon.py')
+# Part of the options hash, bump it when the names of the same options change (E.g: new parsing or naming rules)
+OPTIONS_FORMAT_VERSION = 1
+# Files shared between the runs, next to the tmux server socket like the other runtime files
+OPTIONS_SNAPSHOT_FILE = 'options.json'
+NAME_CACHE_FILE = 'names.json'
+LAYOUT_FINGERPRINTS_FILE = 'layouts.json'
 
 DEFAULT_PROGRAM_ICONS = {
     'nvim': '',  # nf-dev-vim
@@ -49,51 +83,113 @@ DEFAULT_PROGRAM_ICONS = {
     'sh': '',  # nf-dev-terminal
 }
 
+# Resolved window names, kept across the renames of a long-running process (daemon, events, watcher)
+NAME_CACHE = NameCache(0)
+
 
-def get_option(server: Server, option: str, default: Any) -> Any:
-    out = server.cmd('show-option', '-gv', f'{OPTIONS_PREFIX}{option}').stdout
-    if len(out) == 0:
+def parse_option_value(option: str, value: str, default: Any) -> Any:
+    if len(value) == 0:
         return default
 
-    # If the option is icon_style and the output looks like a bare string (not quoted)
-    # wrap it in quotes to avoid NameError when evaluating
-    if option == 'icon_style' and out[0] and not (out[0].startswith("'") or out[0].startswith('"')):
-        return out[0]  # Return the raw string value
+    # If the option is an enum option and the output looks like a bare string (not quoted)
+    # use it as is instead of parsing it
+    if option in ('icon_style', 'program_detection') and not (value.startswith("'") or value.startswith('"')):
+        return value  # Return the raw string value
 
     try:
-        return eval(out[0])
-    except NameError:
-        # If eval fails due to NameError, return the raw string
-        return out[0]
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        # Not a python literal (E.g: bare word), return the raw string
+        return value
 
 
-def set_option(server: Server, option: str, val: str):
-    server.cmd('set-option', '-g', f'{OPTIONS_PREFIX}{option}', val)
+def parse_show_options(lines: List[str]) -> Dict[str, str]:
+    """Parse `show-options` output of the plugin options
 
+    Returns:
+        Dict of option name without OPTIONS_PREFIX to its raw value (as `show-option -v` prints it)
 
-def get_window_option(server: Server, window_id: Optional[str], option: str, default: Any) -> Any:
-    return get_window_tmux_option(server, window_id, f'{OPTIONS_PREFIX}{option}', default, do_eval=True)
+    E.g:
+        @tmux_window_name_use_tilde True -> {'use_tilde': 'True'}
+        @tmux_window_name_custom_icons "{\"python\": \"🐍\"}" -> {'custom_icons': '{"python": "🐍"}'}
+    """
+    options = {}
+    for line in lines:
+        if not line.startswith(OPTIONS_PREFIX):
+            continue
 
+        name, _, quoted_value = line.partition(' ')
+        try:
+            value = ''.join(shlex.split(quoted_value))
+        except ValueError:
+            value = quoted_value
 
-def get_window_tmux_option(
-    server: Server, window_id: Optional[str], option: str, default: Any, do_eval: bool = False
-) -> Any:
-    arguments = ['show-option', '-wqv']
+        # tmux escapes a leading ~ even inside double quotes
+        if quoted_value.startswith('"\\~'):
+            value = value[1:]
 
-    if window_id is not None:
-        arguments.append('-t')
-        arguments.append(window_id)
+        options[name[len(OPTIONS_PREFIX) :]] = value
 
-    arguments.append(option)
-    out = server.cmd(*arguments).stdout
+    return options
 
-    if len(out) == 0:
-        return default
 
-    if do_eval:
-        return eval(out[0])
+def get_options(server: Server) -> Dict[str, str]:
+    """Get all the raw global plugin options with a single tmux command"""
+    return parse_show_options(server.cmd('show-options', '-g').stdout)
+
+
+def get_options_hash(raw_options: Dict[str, str]) -> str:
+    """Hash the raw options with the defaults and format version of this version of the plugin
+
+    The hash keys the options snapshot, the persisted names cache and the layout fingerprints,
+    an upgrade that changes the defaults invalidates them.
+    """
+    schema = [OPTIONS_FORMAT_VERSION, repr(Options())]
+    return hashlib.sha1(json.dumps([schema, raw_options], sort_keys=True).encode()).hexdigest()
+
+
+def load_options_snapshot(snapshot_path: str, options_hash: str) -> Optional[Dict[str, Any]]:
+    """Load the parsed options values saved by a previous run, if the raw options didn't change since"""
+    try:
+        # Only trust our own snapshot
+        if os.stat(snapshot_path).st_uid != os.getuid():
+            return None
+
+        with open(snapshot_path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get('hash') != options_hash:
+        return None
 
-    return out[0]
+    return snapshot['options']
+
+
+def save_options_snapshot(snapshot_path: str, options_hash: str, fields_values: Dict[str, Any]):
+    tmp_file = f'{snapshot_path}.{os.getpid()}'
+    try:
+        with open(tmp_file, 'w') as f:
+            json.dump({'hash': options_hash, 'options': fields_values}, f)
+        os.replace(tmp_file, snapshot_path)
+    except (OSError, TypeError, ValueError):
+        # Values that can't be saved as json will be parsed again next run
+        logging.debug('failed to save options snapshot', exc_info=True)
+        try:
+            os.unlink(tmp_file)
+        except OSError:
+            pass
+
+
+def decode_icon(icon: str) -> str:
+    # Decode Unicode escape sequences if present
+    if icon.startswith('\\u'):
+        return icon.encode('utf-8').decode('unicode-escape')
+    return icon
+
+
+def compile_substitute_sets(substitute_sets: List[Tuple]) -> SubstituteRules:
+    return SubstituteRules(substitute_sets)
 
 
 def set_window_tmux_option(server: Server, window_id: Optional[str], option: str, value: str) -> Any:
@@ -108,56 +204,38 @@ def set_window_tmux_option(server: Server, window_id: Optional[str], option: str
     server.cmd(*arguments)
 
 
-def post_restore(server: Server):
-    # Re enable tmux-window-name if `automatic-rename` is on
-    for window in server.windows:
-        if get_window_tmux_option(server, window.window_id, 'automatic-rename', 'on') == 'on':
-            set_window_tmux_option(server, window.window_id, f'{OPTIONS_PREFIX}enabled', '1')
-        else:
-            set_window_tmux_option(server, window.window_id, f'{OPTIONS_PREFIX}enabled', '0')
-
-    # Enable rename hook to enable tmux-window-name on later windows
-    enable_user_rename_hook(server)
-
+@dataclass
+class WindowState:
+    enabled: bool = True  # @tmux_window_name_enabled
+    automatic_rename: bool = False
 
-def enable_user_rename_hook(server: Server):
-    """
-    The hook:
-        if window has name:
-            set @tmux_window_name_enabled to 1
-        else:
-            set @tmux_window_name_enabled to 0
 
-    @tmux_window_name_enabled (window option):
-        Indicator if we should rename the window or not
-    """
-    current_file = Path(__file__).absolute()
-    server.cmd(
-        'set-hook',
-        '-g',
-        f'after-rename-window[{HOOK_INDEX}]',
-        f'if-shell "[ #{{n:window_name}} -gt 0 ]" "set -w @tmux_window_name_enabled 0" "set -w @tmux_window_name_enabled 1; run-shell "{current_file}"',
-    )
+def get_panes_windows_states(panes: List[PaneInfo]) -> Dict[str, WindowState]:
+    """Get the state of the windows of the panes, from the window options listed with them"""
+    return {
+        p.window_id: WindowState(bool(parse_option_value('enabled', p.window_enabled, 1)), p.automatic_rename)
+        for p in panes
+    }
 
 
-def disable_user_rename_hook(server: Server):
-    server.cmd('set-hook', '-ug', f'after-rename-window[{HOOK_INDEX}]')
+def post_restore(server: Server, options: Options):
+    """Restore the enabled option of the windows from their automatic-rename, then rename all of them
 
+    A restore creates many windows (E.g: hundreds with tmux-resurrect), the options of all the windows
+    are read in one listing and written in one batch.
+    """
+    batch = TmuxCommandBatch()
 
-@contextmanager
-def tmux_guard(server: Server) -> Iterator[bool]:
-    already_running = bool(get_option(server, 'running', 0))
+    # Re enable tmux-window-name if `automatic-rename` is on
+    for window_id, automatic_rename in list_windows_automatic_rename(server).items():
+        set_window_tmux_option(batch, window_id, f'{OPTIONS_PREFIX}enabled', '1' if automatic_rename else '0')
 
-    try:
-        if not already_running:
-            set_option(server, 'running', '1')
-            disable_user_rename_hook(server)
+    # Enable rename hook to enable tmux-window-name on later windows
+    enable_user_rename_hook(batch)
+    batch.submit(server)
 
-        yield already_running
-    finally:
-        if not already_running:
-            enable_user_rename_hook(server)
-            set_option(server, 'running', '0')
+    # The hook was disabled during the restore, rename the restored windows at once
+    rename_windows(server, options, all_sessions=True)
 
 
 class IconStyle(str, Enum):
@@ -167,6 +245,11 @@ class IconStyle(str, Enum):
     DIR_AND_ICON = 'dir_and_icon'
 
 
+class ProgramDetection(str, Enum):
+    CHILDREN = 'children'  # First child of the pane process
+    FOREGROUND = 'foreground'  # Foreground process group leader of the pane terminal
+
+
 @dataclass
 class Options:
     shells: List[str] = field(default_factory=lambda: ['bash', 'fish', 'sh', 'zsh'])
@@ -187,30 +270,66 @@ class Options:
     )
     dir_substitute_sets: List[Tuple] = field(default_factory=lambda: [])
     show_program_args: bool = True
+    program_detection: ProgramDetection = ProgramDetection.CHILDREN
+    name_cache_size: int = 1024
+    persist_name_cache: bool = False
+    debounce_ms: int = 0
+    daemon: bool = False
+    events: bool = False
+    watch: bool = False
+    watch_cpu_budget: float = 1.0  # Percent of one CPU
+    control_mode: bool = False
     log_level: str = 'WARNING'
+    timings: bool = False
+    options_hash: str = field(default='', init=False, repr=False, compare=False)  # Hash of the raw tmux options
 
     @staticmethod
     def from_options(server: Server):
-        fields = Options.__dataclass_fields__
-
         def default_field_value(f: field):
             if callable(f.default_factory):
                 return f.default_factory()
             return f.default
 
-        fields_values = {
-            field.name: get_option(server, field.name, default_field_value(field)) for field in fields.values()
-        }
-
-        # Convert icon_style from string to enum if it's a string
-        if 'icon_style' in fields_values and isinstance(fields_values['icon_style'], str):
-            try:
-                fields_values['icon_style'] = IconStyle(fields_values['icon_style'])
-            except ValueError:
-                # Use default if the value is invalid
-                fields_values['icon_style'] = IconStyle.NAME
-
-        return Options(**fields_values)
+        init_fields = [f for f in fields(Options) if f.init]
+        init_names = {f.name for f in init_fields}
+        # Only the options fields, not state options (E.g: @tmux_window_name_running of older versions)
+        raw_options = {name: value for name, value in get_options(server).items() if name in init_names}
+        options_hash = get_options_hash(raw_options)
+
+        snapshot_path = get_server_runtime_file(server, OPTIONS_SNAPSHOT_FILE)
+        fields_values = load_options_snapshot(snapshot_path, options_hash)
+        # Snapshot of another version of the options
+        if fields_values is None or set(fields_values) != init_names:
+            fields_values = {
+                f.name: parse_option_value(f.name, raw_options.get(f.name, ''), default_field_value(f))
+                for f in init_fields
+            }
+            save_options_snapshot(snapshot_path, options_hash, fields_values)
+
+        # Convert enum options from string to enum if it's a string
+        for name, enum_type, enum_default in (
+            ('icon_style', IconStyle, IconStyle.NAME),
+            ('program_detection', ProgramDetection, ProgramDetection.CHILDREN),
+        ):
+            if name in fields_values and isinstance(fields_values[name], str):
+                try:
+                    fields_values[name] = enum_type(fields_values[name])
+                except ValueError:
+                    # Use default if the value is invalid
+                    fields_values[name] = enum_default
+
+        options = Options(**fields_values).compile()
+        options.options_hash = options_hash
+        return options
+
+    def compile(self) -> 'Options':
+        """Get a copy with precompiled substitute sets and decoded custom icons"""
+        return replace(
+            self,
+            substitute_sets=compile_substitute_sets(self.substitute_sets),
+            dir_substitute_sets=compile_substitute_sets(self.dir_substitute_sets),
+            custom_icons={name: decode_icon(icon) for name, icon in self.custom_icons.items()},
+        )
 
 
 def get_program_icon(program_name: str, options: Options) -> str:
@@ -222,11 +341,7 @@ def get_program_icon(program_name: str, options: Options) -> str:
         base_name = base_name.split(':')[0]
 
     # First check custom icons, then fall back to built-in icons
-    icon = options.custom_icons.get(base_name) or DEFAULT_PROGRAM_ICONS.get(base_name, '')
-
-    # Decode Unicode escape sequences if present
-    if icon.startswith('\\u'):
-        icon = icon.encode('utf-8').decode('unicode-escape')
+    icon = decode_icon(options.custom_icons.get(base_name) or DEFAULT_PROGRAM_ICONS.get(base_name, ''))
     logging.debug(f'Getting icon for program {program_name} (base_name: {base_name}) -> {icon!r}')
     return icon
 
@@ -268,42 +383,36 @@ def parse_shell_command(shell_cmd: List[bytes]) -> Optional[str]:
     return ' '.join(shell_cmd_str[1:])
 
 
-def get_current_program(running_programs: List[bytes], pane: TmuxPane, options: Options) -> Optional[str]:
+def get_current_program(running_programs: RunningPrograms, pane: PaneInfo, options: Options) -> Optional[str]:
     if pane.pane_pid is None:
         raise ValueError(f'Pane id is none, pane: {pane}')
 
     logging.debug(f"searching for active pane's child with pane_pid={pane.pane_pid}")
 
-    for program in running_programs:
+    for program in running_programs.get(int(pane.pane_pid), []):
         program = program.split()
+        program_name = program[0].decode()
+        program_name_stripped = re.sub(USR_BIN_REMOVER[0], USR_BIN_REMOVER[1], program_name)
+        logging.debug(f'program={program} program_name={program_name} program_name_stripped={program_name_stripped}')
 
-        # if pid matches parse program
-        if int(program[0]) == int(pane.pane_pid):
-            program = program[1:]
-            program_name = program[0].decode()
-            program_name_stripped = re.sub(USR_BIN_REMOVER[0], USR_BIN_REMOVER[1], program_name)
-            logging.debug(
-                f'program={program} program_name={program_name} program_name_stripped={program_name_stripped}'
-            )
+        if len(program) > 1 and any(script in program[1].decode() for script in SCRIPT_NAMES):
+            logging.debug(f'skipping {program[1]}, its the script')
+            continue
 
-            if len(program) > 1 and 'scripts/rename_session_windows.py' in program[1].decode():
-                logging.debug(f'skipping {program[1]}, its the script')
-                continue
+        if program_name_stripped in options.ignored_programs:
+            logging.debug(f'skipping {program_name_stripped}, its ignored')
+            continue
 
-            if program_name_stripped in options.ignored_programs:
-                logging.debug(f'skipping {program_name_stripped}, its ignored')
-                continue
+        # Ignore shells
+        if program_name_stripped in options.shells:
+            shell_program = parse_shell_command(program)
+            logging.debug(f'its a shell, parsed shell program {shell_program}')
+            return shell_program
 
-            # Ignore shells
-            if program_name_stripped in options.shells:
-                shell_program = parse_shell_command(program)
-                logging.debug(f'its a shell, parsed shell program {shell_program}')
-                return shell_program
+        if not options.show_program_args:
+            return program[0].decode()
 
-            if not options.show_program_args:
-                return program[0].decode()
-
-            return b' '.join(program).decode()
+        return b' '.join(program).decode()
 
     return None
 
@@ -322,18 +431,43 @@ def get_program_if_dir(program_line: str, dir_programs: List[str]) -> Optional[s
     return None
 
 
-def get_session_active_panes(session: Session) -> List[TmuxPane]:
-    session_windows_ids = [window.window_id for window in session.windows]
+def get_active_panes(panes: List[PaneInfo]) -> List[PaneInfo]:
+    active_panes = []
+    windows_ids = set()
+    for p in panes:
+        # Windows linked to multiple sessions are listed once per session
+        if p.pane_active and p.window_id not in windows_ids:
+            windows_ids.add(p.window_id)
+            active_panes.append(p)
+
+    return active_panes
+
 
-    return [p for p in session.server.panes if p.pane_active == '1' and p.window_id in session_windows_ids]
+def rename_window(
+    server: Server,
+    window_id: str,
+    window_name: str,
+    max_name_len: int,
+    options: Options,
+    current_name: Optional[str] = None,
+) -> bool:
+    """Rename window if the name changed
 
+    Args:
+        current_name (Optional[str]): current name of the window, None to rename anyway
 
-def rename_window(server: Server, window_id: str, window_name: str, max_name_len: int, options: Options):
+    Returns:
+        True if the window was renamed
+    """
     logging.debug(f'renaming window_id={window_id} to window_name={window_name}')
 
     window_name = window_name[:max_name_len]
     logging.debug(f'shortened name window_name={window_name}')
 
+    if window_name == current_name:
+        logging.debug(f'window_id={window_id} name is unchanged, skipping rename')
+        return False
+
     server.cmd('rename-window', '-t', window_id, window_name)
     set_window_tmux_option(
         server, window_id, 'automatic-rename-format', window_name
@@ -341,73 +475,294 @@ def rename_window(server: Server, window_id: str, window_name: str, max_name_len
     set_window_tmux_option(
         server, window_id, 'automatic-rename', 'on'
     )  # Turn on automatic-rename to make resurrect remeber the option
+    return True
+
+
+def needs_process_scan(pane: PaneInfo, options: Options) -> bool:
+    """Check if the program of the pane is read from the processes, otherwise it's the pane current command
+
+    tmux tracks the command name of the pane foreground process group, for a pane running the default shell it's
+    usually the program the processes would give (a child of the shell), by its base name (see the README).
+    The processes are needed for the arguments, for shells (the script they run), dir programs, ignored programs
+    (another child is named instead) and panes started with a command (the current command can be the pane process
+    itself, the processes give its child)
+    """
+    command = pane.pane_current_command
+    return (
+        options.show_program_args
+        or not command
+        or bool(pane.pane_start_command)
+        or command in options.shells
+        or command in options.dir_programs
+        or command in options.ignored_programs
+    )
+
+
+def collect_panes_snapshot(
+    server: Server, options: Options, session_id: Optional[str] = None, all_sessions: bool = False
+) -> Snapshot:
+    # With the arguments every pane needs the processes, `ps` runs while the panes are listed
+    if options.show_program_args:
+        return collect_snapshot(server, session_id, all_sessions)
+
+    return collect_snapshot(
+        server,
+        session_id,
+        all_sessions,
+        lambda panes: any(needs_process_scan(p, options) for p in get_active_panes(panes)),
+    )
+
+
+def get_panes_programs(
+    server: Server,
+    options: Options,
+    session_id: Optional[str] = None,
+    all_sessions: bool = False,
+    snapshot: Optional[Snapshot] = None,
+) -> List[Pane]:
+    """
+    Args:
+        snapshot (Optional[Snapshot]): panes (and `ps` output) already collected, collected again if not given
+    """
+    if snapshot is None:
+        with TIMINGS.phase('snapshot'):
+            snapshot = collect_panes_snapshot(server, options, session_id, all_sessions)
+
+    session_active_panes = get_active_panes(snapshot.panes)
+
+    with TIMINGS.phase('programs'):
+        panes_scanned = [(p, needs_process_scan(p, options)) for p in session_active_panes]
+        running_programs: RunningPrograms = {}
+        if any(scanned for _, scanned in panes_scanned):
+            running_programs = get_running_programs(
+                (int(p.pane_pid) for p, scanned in panes_scanned if scanned and p.pane_pid is not None),
+                options.program_detection == ProgramDetection.FOREGROUND,
+                snapshot.ps_programs,
+            )
+
+        return [
+            Pane(p, get_current_program(running_programs, p, options) if scanned else p.pane_current_command)
+            for p, scanned in panes_scanned
+        ]
+
+
+def get_active_programs_fingerprints(
+    panes: List[PaneInfo], options: Options
+) -> Optional[Dict[int, ProgramsFingerprint]]:
+    """Get the programs fingerprints of the active panes, for the layout fingerprints
+
+    Returns:
+        None if the layout can't be fingerprinted: options that aren't from tmux, or no /proc (it would need `ps`)
+    """
+    if not options.options_hash or not is_proc_available():
+        return None
+
+    # The other panes are named by their current command, it's in the layout fingerprints
+    return get_programs_fingerprints(
+        {p.pane_pid for p in panes if p.pane_active and p.pane_pid is not None and needs_process_scan(p, options)},
+        options.program_detection == ProgramDetection.FOREGROUND,
+    )
+
+
+def get_sessions_fingerprints(
+    panes: List[PaneInfo],
+    options: Options,
+    programs_fingerprints: Dict[int, ProgramsFingerprint],
+    renames: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """Get the layout fingerprint of each session of the panes, keyed by session (the file is per tmux server)"""
+    return get_layout_fingerprints(panes, programs_fingerprints, options.options_hash, renames)
+
+
+def get_batch_renames(batch: TmuxCommandBatch) -> Dict[str, str]:
+    """Get the new name of each window renamed by the batch"""
+    return {str(command[2]): str(command[3]) for command in batch.commands if command[0] == 'rename-window'}
+
+
+def get_rename_target(session_id: Optional[str] = None, all_sessions: bool = False) -> str:
+    """Get the target of a run for the rename lock, the current session is resolved from $TMUX when possible
+
+    E.g:
+        all_sessions -> *
+        $TMUX=/tmp/tmux-1000/default,1234,2 -> $2
+    """
+    from rename_daemon import get_tmux_session_id
 
+    if all_sessions:
+        return ALL_SESSIONS
+
+    return session_id or get_tmux_session_id() or ''
+
+
+def rename_windows(server: Server, options: Options, session_id: Optional[str] = None, all_sessions: bool = False):
+    """Rename the windows of the session (or of all the sessions), one run at a time for each tmux server
+
+    A run requested while another one renames runs after it, merged with the other requests that waited.
+    """
+    with TIMINGS.phase('lock'):
+        lock_path = get_server_runtime_file(server, 'rename.lock')
+
+    def run(target: str):
+        if target == ALL_SESSIONS:
+            rename_target_windows(server, options, None, True)
+        else:
+            rename_target_windows(server, options, target or None, False)
 
-def get_panes_programs(session: Session, options: Options) -> List[Pane]:
-    session_active_panes = get_session_active_panes(session)
     try:
-        output_bytes = subprocess.check_output(['ps', '-a', '-oppid,command'])
-        all_lines_bytes = output_bytes.splitlines()[1:]
-        running_programs = [line for line in all_lines_bytes if b'<defunct>' not in line]
-        logging.debug(f'running_programs={running_programs}')
-    # can occur if ps has empty output
-    except subprocess.CalledProcessError:
-        logging.warning('nothing returned from `ps -a -oppid,command`')
-        running_programs = []
-
-    return [Pane(p, get_current_program(running_programs, p, options)) for p in session_active_panes]
-
-
-def rename_windows(server: Server, options: Options):
-    with tmux_guard(server) as already_running:
-        if already_running:
-            return
-
-        current_session = get_current_session(server)
-
-        panes_programs = get_panes_programs(current_session, options)
-        panes_programs = [fix_pane_path(p, options) for p in panes_programs]
-        panes_with_programs = [p for p in panes_programs if p.program is not None]
-        panes_with_dir = [p for p in panes_programs if p.program is None]
-
-        logging.debug(f'panes_with_programs={panes_with_programs}')
-        logging.debug(f'panes_with_dir={panes_with_dir}')
-
-        for pane in panes_with_programs:
-            enabled_in_window = get_window_option(server, pane.info.window_id, 'enabled', 1)
-            if not enabled_in_window:
-                logging.debug(f'tmux winodw isnt enabled in {pane.info.window_id}')
-                continue
-
-            program_name = get_program_if_dir(str(pane.program), options.dir_programs)
-            if program_name is not None:
-                logging.debug(f'program is a dir program, program:{str(pane.program)}')
-                pane.program = program_name
-                panes_with_dir.append(pane)
-                continue
-
-            logging.debug(f'processing program without dir: {str(pane.program)}')
-            pane.program, _ = substitute_name(str(pane.program), options.substitute_sets, options, True)
-            rename_window(server, str(pane.info.window_id), pane.program, options.max_name_len, options)
+        if not run_exclusive(lock_path, get_rename_target(session_id, all_sessions), run):
+            logging.debug('another run is renaming, it will rename again after it')
+    finally:
+        TIMINGS.report()
+
+
+def rename_target_windows(server: Server, options: Options, session_id: Optional[str], all_sessions: bool):
+    with TIMINGS.phase('snapshot'):
+        snapshot = collect_panes_snapshot(server, options, session_id, all_sessions)
+    panes = snapshot.panes
+
+    # Most runs (E.g: selecting a window) change nothing, exit before reading the programs
+    with TIMINGS.phase('fingerprint'):
+        programs_fingerprints = get_active_programs_fingerprints(panes, options)
+        if programs_fingerprints is not None:
+            fingerprints = get_sessions_fingerprints(panes, options, programs_fingerprints)
+            previous_fingerprints = load_layout_fingerprints(get_server_runtime_file(server, LAYOUT_FINGERPRINTS_FILE))
+            if len(fingerprints) > 0 and all(previous_fingerprints.get(k) == v for k, v in fingerprints.items()):
+                logging.debug('layout is unchanged since the last renames, skipping')
+                return
+
+    panes_programs = get_panes_programs(server, options, session_id, all_sessions, snapshot)
+    if len(panes_programs) == 0:
+        return
+
+    windows_states = get_panes_windows_states(panes)
 
+    # Each session windows get exclusive names among themselves
+    sessions_panes: Dict[str, List[Pane]] = {}
+    for pane in panes_programs:
+        sessions_panes.setdefault(pane.info.session_id, []).append(pane)
+
+    NAME_CACHE.max_size = options.name_cache_size
+    if options.persist_name_cache and len(NAME_CACHE) == 0:
+        NAME_CACHE.load(get_server_runtime_file(server, NAME_CACHE_FILE))
+
+    # Renames of all the windows are submitted together at the end, with the hook off around them
+    # (it would take them for user renames and disable the windows)
+    batch = TmuxCommandBatch()
+    disable_user_rename_hook(batch)
+    for session_panes in sessions_panes.values():
+        rename_panes_windows(batch, session_panes, windows_states, options)
+
+    if programs_fingerprints is not None:
+        # With the names after the renames, the next run compares to them
+        fingerprints = get_sessions_fingerprints(panes, options, programs_fingerprints, get_batch_renames(batch))
+
+    # Nothing to rename, leave the hook as it is
+    if len(batch) > 1:
+        enable_user_rename_hook(batch)
+        with TIMINGS.phase('renames'):
+            batch.submit(server)
+
+    if programs_fingerprints is not None:
+        save_layout_fingerprints(
+            get_server_runtime_file(server, LAYOUT_FINGERPRINTS_FILE), fingerprints, previous_fingerprints
+        )
+
+    if options.persist_name_cache:
+        NAME_CACHE.save(get_server_runtime_file(server, NAME_CACHE_FILE))
+
+
+def rename_panes_windows(
+    batch: TmuxCommandBatch, panes_programs: List[Pane], windows_states: Dict[str, WindowState], options: Options
+):
+    panes_programs = [fix_pane_path(p, options) for p in panes_programs]
+    panes_with_programs = [p for p in panes_programs if p.program is not None]
+    panes_with_dir = [p for p in panes_programs if p.program is None]
+
+    logging.debug(f'panes_with_programs={panes_with_programs}')
+    logging.debug(f'panes_with_dir={panes_with_dir}')
+
+    for pane in panes_with_programs:
+        window_state = windows_states.get(str(pane.info.window_id), WindowState())
+        if not window_state.enabled:
+            logging.debug(f'tmux winodw isnt enabled in {pane.info.window_id}')
+            continue
+
+        program_name = get_dir_program_name(str(pane.program), options)
+        if program_name is not None:
+            logging.debug(f'program is a dir program, program:{str(pane.program)}')
+            pane.program = program_name
+            panes_with_dir.append(pane)
+            continue
+
+        logging.debug(f'processing program without dir: {str(pane.program)}')
+        pane.program = get_program_window_name(str(pane.program), options)
+        rename_window(
+            batch,
+            str(pane.info.window_id),
+            pane.program,
+            options.max_name_len,
+            options,
+            pane.info.window_name if window_state.automatic_rename else None,
+        )
+
+    with TIMINGS.phase('exclusive_paths'):
         exclusive_paths = get_exclusive_paths(panes_with_dir, options.ignore_program_diffs)
-        logging.debug(
-            f'get_exclusive_paths result, input: panes_with_dir={panes_with_dir}, output: exclusive_paths={exclusive_paths}'
+    logging.debug(
+        f'get_exclusive_paths result, input: panes_with_dir={panes_with_dir}, output: exclusive_paths={exclusive_paths}'
+    )
+
+    for p, display_path in exclusive_paths:
+        window_state = windows_states.get(str(p.info.window_id), WindowState())
+        if not window_state.enabled:
+            logging.debug(f'tmux winodw isnt enabled in {p.info.window_id}')
+            continue
+
+        logging.debug(f'processing exclusive_path: display_path={display_path} p.program={p.program}')
+        rename_window(
+            batch,
+            str(p.info.window_id),
+            get_dir_window_name(p.program, str(display_path), options),
+            options.max_name_len,
+            options,
+            p.info.window_name if window_state.automatic_rename else None,
         )
 
-        for p, display_path in exclusive_paths:
-            enabled_in_window = get_window_option(server, p.info.window_id, 'enabled', 1)
-            if not enabled_in_window:
-                logging.debug(f'tmux winodw isnt enabled in {p.info.window_id}')
-                continue
 
-            logging.debug(f'processing exclusive_path: display_path={display_path} p.program={p.program}')
-            display_path, _ = substitute_name(str(display_path), options.dir_substitute_sets, options, False)
-            if p.program is not None:
-                p.program, style = substitute_name(p.program, options.substitute_sets, options, True)
-                display_path = f'{p.program}{" " if style.icon_set else ":"}{"" if style.only_icon else display_path}'
+def get_cached_name(key: Tuple[str, Optional[str], Optional[str]], options: Options, resolve: Callable[[], Any]) -> Any:
+    """Get a name from NAME_CACHE by (kind, program command line, path) and the options hash"""
+    if not options.options_hash:
+        # Options that weren't read from tmux, can't tell them apart
+        return resolve()
+
+    return NAME_CACHE.get_or_compute((*key, options.options_hash), resolve)
+
+
+def get_dir_program_name(program: str, options: Options) -> Optional[str]:
+    """Get the name of a dir program (None for other programs), cached by its command line and the options"""
+    return get_cached_name(
+        ('dir_program', program, None), options, lambda: get_program_if_dir(program, options.dir_programs)
+    )
+
+
+def get_program_window_name(program: str, options: Options) -> str:
+    """Get the window name of a program, cached by its command line and the options"""
+    return get_cached_name(
+        ('program', program, None), options, lambda: substitute_name(program, options.substitute_sets, options, True)[0]
+    )
+
+
+def get_dir_window_name(program: Optional[str], display_path: str, options: Options) -> str:
+    """Get the window name of a directory with the dir program running in it, cached by both and the options"""
 
-            rename_window(server, str(p.info.window_id), str(display_path), options.max_name_len, options)
+    def resolve() -> str:
+        dir_name, _ = substitute_name(display_path, options.dir_substitute_sets, options, False)
+        if program is None:
+            return dir_name
+
+        program_name, style = substitute_name(program, options.substitute_sets, options, True)
+        return f'{program_name}{" " if style.icon_set else ":"}{"" if style.only_icon else dir_name}'
+
+    return get_cached_name(('dir', program, display_path), options, resolve)
 
 
 # Fix pane path according to the options
@@ -420,22 +775,18 @@ def fix_pane_path(pane: Pane, options: Options) -> Pane:
         path = path.replace(HOME_DIR, '~')
         logging.debug(f'replaced tilde with HOME_DIR={HOME_DIR}: path={path}')
 
-    pane.info.pane_current_path = path
+    pane.info = pane.info._replace(pane_current_path=path)
     return pane
 
 
-def get_current_session(server: Server) -> Session:
-    session_id = server.cmd('display-message', '-p', '#{session_id}').stdout[0]
-    return Session(server, session_id=session_id)
-
-
 def substitute_name(
     name: str, substitute_sets: List[Tuple], options: Options, apply_icon: bool
 ) -> Tuple[str, StyleResult]:
     logging.debug(f'substituting {name}')
-    for pattern, replacement in substitute_sets:
-        name = re.sub(pattern, replacement, name)
-        logging.debug(f'after pattern={pattern} replacement={replacement}: {name}')
+    if not isinstance(substitute_sets, SubstituteRules):
+        # Options that weren't compiled
+        substitute_sets = SubstituteRules(substitute_sets)
+    name = substitute_sets.apply(name)
 
     if apply_icon:
         return apply_icon_if_in_style(name, options)
@@ -444,9 +795,7 @@ def substitute_name(
 
 
 def print_programs(server: Server, options: Options):
-    current_session = get_current_session(server)
-
-    panes_programs = get_panes_programs(current_session, options)
+    panes_programs = get_panes_programs(server, options)
 
     for pane in panes_programs:
         if pane.program:
@@ -454,8 +803,266 @@ def print_programs(server: Server, options: Options):
             print(f'{pane.program} -> {program_name}')
 
 
+def get_server_socket_path(server: Server) -> str:
+    from rename_daemon import get_tmux_socket_path
+
+    tmux_socket_path = get_tmux_socket_path()
+    if tmux_socket_path is None:
+        tmux_socket_path = server.cmd('display-message', '-p', '#{socket_path}').stdout[0]
+    return tmux_socket_path
+
+
+def get_server_runtime_file(server: Server, name: str) -> str:
+    """Get the path of a runtime file of the tmux server, in the directory of its socket"""
+    from rename_daemon import get_server_runtime_path
+
+    return get_server_runtime_path(get_server_socket_path(server), name)
+
+
+def run_daemon(server: Server, options: Options):
+    """
+    Keep the options in memory and rename on messages from the hook client (rename_daemon.py)
+
+    Messages:
+        rename [session_id]: rename the windows of the session (current session if not given)
+        reload: reload the options, sent when the plugin is sourced again
+        stop: stop the daemon
+    """
+    import signal
+    import sys
+
+    from rename_daemon import get_daemon_socket_path, is_daemon_alive, serve
+
+    daemon_socket_path = get_daemon_socket_path(get_server_socket_path(server))
+    if is_daemon_alive(daemon_socket_path):
+        logging.debug(f'daemon is already running on {daemon_socket_path}')
+        return
+
+    def handle(message: str) -> bool:
+        nonlocal options
+        logging.debug(f'daemon got message={message}')
+        command, *args = message.split()
+
+        if command == 'stop':
+            return False
+
+        if command == 'reload':
+            options = Options.from_options(server)
+            logging.debug(f'reloaded options: {options}')
+        elif command == 'rename':
+            try:
+                rename_windows(server, options, args[0] if args else None)
+            except Exception:
+                logging.exception(f'failed to handle message={message}')
+        else:
+            logging.warning(f'unknown daemon message={message}')
+
+        return True
+
+    # Exit through serve's cleanup on kill (E.g: the tmux server exits), so the socket is removed
+    for signal_number in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signal_number, lambda *_: sys.exit(0))
+
+    logging.debug(f'daemon listening on {daemon_socket_path}')
+    serve(daemon_socket_path, handle, server.is_alive, lambda: options.debounce_ms / 1000)
+
+
+def lock_server_runtime_file(server: Server, name: str) -> Optional[IO]:
+    """Lock a runtime file of the tmux server, the lock is held until the returned file is closed
+
+    Returns:
+        None if another process holds the lock
+    """
+    return try_lock(get_server_runtime_file(server, name))
+
+
+def rename_event_targets(
+    server: Server, options: Options, lines: List[str], windows_sessions: Dict[str, Set[str]]
+) -> Dict[str, Set[str]]:
+    """Rename the sessions of the windows affected by the notifications
+
+    Args:
+        windows_sessions (Dict[str, Set[str]]): sessions of every window before the notifications,
+            to find the sessions of closed windows
+
+    Returns:
+        Sessions of every window after the renames
+    """
+    from tmux_events import get_event_targets
+
+    windows_ids, sessions_ids = get_event_targets(lines)
+    logging.debug(f'renaming on notifications {lines}')
+    return rename_targets_sessions(server, options, windows_ids, sessions_ids, windows_sessions)
+
+
+def rename_targets_sessions(
+    server: Server,
+    options: Options,
+    windows_ids: Set[str],
+    sessions_ids: Set[str],
+    windows_sessions: Dict[str, Set[str]],
+) -> Dict[str, Set[str]]:
+    """Rename the sessions and the sessions of the windows
+
+    Returns:
+        Sessions of every window after the renames
+    """
+    from tmux_events import list_windows_sessions
+
+    if len(windows_ids) == 0 and len(sessions_ids) == 0:
+        return windows_sessions
+
+    new_windows_sessions = list_windows_sessions(server)
+    for window_id in windows_ids:
+        sessions_ids |= windows_sessions.get(window_id, set()) | new_windows_sessions.get(window_id, set())
+
+    # Exclusive names depend on the other windows of the session, rename the whole sessions
+    existing_sessions_ids = set().union(*new_windows_sessions.values())
+    for session_id in sorted(sessions_ids & existing_sessions_ids):
+        logging.debug(f'renaming session {session_id}')
+        rename_windows(server, options, session_id)
+
+    return new_windows_sessions
+
+
+def get_windows_programs_fingerprints(server: Server, options: Options, windows_ids: Set[str]) -> Dict[str, Any]:
+    """Get a fingerprint of the programs of the active pane of each window, changes when a program starts or exits
+
+    Returns:
+        Window id -> fingerprint, the closed windows are left out
+    """
+    panes = [
+        p
+        for p in get_active_panes(list_panes(server, all_sessions=True))
+        if p.window_id in windows_ids and p.pane_pid is not None
+    ]
+    programs_fingerprints = get_programs_fingerprints(
+        {p.pane_pid for p in panes}, options.program_detection == ProgramDetection.FOREGROUND
+    )
+    return {p.window_id: (p.pane_pid, p.pane_current_command, programs_fingerprints.get(p.pane_pid)) for p in panes}
+
+
+def run_events(server: Server, options: Options):
+    """
+    Rename on tmux control mode notifications (windows added, closed, selected, active pane changed)
+    and on changes of the active pane program or directory, until the tmux server exits or the option is turned off
+    """
+    from tmux_events import NotificationReader, SettlingWindows, get_added_windows, list_windows_sessions
+
+    lock_file = lock_server_runtime_file(server, 'events.lock')
+    if lock_file is None:
+        logging.debug('events mode is already running')
+        return
+
+    with lock_file:
+        # The control client exits when its session is destroyed, attach again to another session
+        while options.events and server.is_alive():
+            target = get_attach_target(server)
+            if target is None:
+                return
+
+            with NotificationReader(server, target) as reader:
+                if not reader.start():
+                    return
+
+                windows_sessions = list_windows_sessions(server)
+                settling_windows = SettlingWindows()
+                while True:
+                    lines = reader.read(settling_windows.get_timeout(time.monotonic()))
+                    if lines is None:
+                        break
+
+                    # The added windows were renamed while their shell may have been starting
+                    if settling_windows.is_due(time.monotonic()):
+                        try:
+                            fingerprints = get_windows_programs_fingerprints(
+                                server, options, set(settling_windows.windows)
+                            )
+                            changed_windows = settling_windows.check(fingerprints, time.monotonic())
+                            windows_sessions = rename_targets_sessions(
+                                server, options, changed_windows, set(), windows_sessions
+                            )
+                        except Exception:
+                            logging.exception(f'failed to rename the added windows {settling_windows.windows}')
+                            settling_windows.clear()
+
+                    # Wait for the rest of a burst (E.g: closing a window changes the active window too)
+                    quiet_period = max(options.debounce_ms / 1000, EVENTS_QUIET_PERIOD)
+                    more_lines = reader.read(quiet_period)
+                    while more_lines:
+                        lines += more_lines
+                        more_lines = reader.read(quiet_period)
+
+                    if len(lines) == 0:
+                        continue
+
+                    options = Options.from_options(server)
+                    if not options.events:
+                        return
+
+                    try:
+                        windows_sessions = rename_event_targets(server, options, lines, windows_sessions)
+                    except Exception:
+                        logging.exception(f'failed to handle notifications {lines}')
+
+                    settling_windows.add(get_added_windows(lines), time.monotonic())
+
+
+def run_watcher(server: Server, options: Options):
+    """
+    Rename when the program of an active pane changes, until the tmux server exits or the option is turned off
+
+    Samples only the programs fingerprints of the active panes, the windows are renamed only when a fingerprint changed.
+    """
+    from pane_watcher import AdaptiveInterval, get_changed_pids, get_cpu_time
+
+    lock_file = lock_server_runtime_file(server, 'watch.lock')
+    if lock_file is None:
+        logging.debug('watcher is already running')
+        return
+
+    with lock_file:
+        interval = AdaptiveInterval(WATCH_MIN_INTERVAL, WATCH_MAX_INTERVAL, options.watch_cpu_budget / 100)
+        active_panes: List[PaneInfo] = []
+        fingerprints: Dict[int, ProgramsFingerprint] = {}
+        refresh_time = 0.0
+
+        while True:
+            start_cpu_time = get_cpu_time()
+
+            if time.monotonic() >= refresh_time:
+                if not server.is_alive():
+                    return
+
+                options = Options.from_options(server)
+                if not options.watch:
+                    return
+
+                interval.cpu_budget = options.watch_cpu_budget / 100
+                # Every session of linked windows, unlike get_active_panes
+                active_panes = [p for p in list_panes(server, all_sessions=True) if p.pane_active]
+                refresh_time = time.monotonic() + WATCH_REFRESH_INTERVAL
+
+            new_fingerprints = get_programs_fingerprints(
+                {p.pane_pid for p in active_panes if p.pane_pid is not None},
+                options.program_detection == ProgramDetection.FOREGROUND,
+            )
+            changed_pids = get_changed_pids(fingerprints, new_fingerprints)
+            fingerprints = new_fingerprints
+
+            sessions_ids = {p.session_id for p in active_panes if p.pane_pid in changed_pids}
+            for session_id in sorted(sessions_ids):
+                logging.debug(f'renaming session {session_id}, programs of pids {changed_pids} changed')
+                try:
+                    rename_windows(server, options, session_id)
+                except Exception:
+                    logging.exception(f'failed to rename session {session_id}')
+
+            time.sleep(interval.update(len(sessions_ids) > 0, get_cpu_time() - start_cpu_time))
+
+
 def main():
-    server = Server()
+    main_start = time.perf_counter()
 
     parser = ArgumentParser('rename_session_windows.py')
     parser.add_argument('--print_programs', action='store_true', help='Prints full name of the programs in the session')
@@ -464,19 +1071,36 @@ def main():
     parser.add_argument(
         '--post_restore',
         action='store_true',
-        help='Restore tmux enabled option from automatic-rename, for internal use, enables rename hook too',
+        help='Restore tmux enabled option from automatic-rename, for internal use, enables rename hook and renames too',
     )
+    parser.add_argument('--daemon', action='store_true', help='Run as a daemon renaming on messages from the hooks')
+    parser.add_argument('--events', action='store_true', help='Rename on tmux notifications until the server exits')
+    parser.add_argument('--watch', action='store_true', help='Rename when programs change until the server exits')
+    parser.add_argument('--session_id', help='Session to rename instead of the current session')
+    parser.add_argument('--timings', action='store_true', help='Print the time of each phase of the run')
+    parser.add_argument('--all_sessions', action='store_true', help='Rename the windows of all the sessions')
 
     args = parser.parse_args()
+    if args.enable_rename_hook or args.disable_rename_hook:
+        # The hook doesn't depend on the options, skip them (and libtmux)
+        if args.enable_rename_hook:
+            enable_user_rename_hook(TmuxClient())
+        else:
+            disable_user_rename_hook(TmuxClient())
+        return
+
+    libtmux_start = time.perf_counter()
+    from libtmux.server import Server
+
+    server = Server()
+    options_start = time.perf_counter()
     options = Options.from_options(server)
+    options_time = time.perf_counter() - options_start
 
-    # Clear loggers from other modules
-    logging.config.dictConfig(
-        {
-            'version': 1,
-            'disable_existing_loggers': True,
-        }
-    )
+    # Clear loggers from other modules, like logging.config with disable_existing_loggers (without importing it)
+    for logger in logging.Logger.manager.loggerDict.values():
+        if isinstance(logger, logging.Logger):
+            logger.disabled = True
 
     log_level = logging._nameToLevel.get(options.log_level, logging.WARNING)
     log_file = os.path.join(tempfile.gettempdir(), 'tmux-window-name')
@@ -486,17 +1110,43 @@ def main():
     logging.debug(f'Args: {args}')
     logging.debug(f'Options: {options}')
 
+    if args.timings or options.timings:
+        TIMINGS.enable(args.timings, SCRIPT_START)
+        TIMINGS.add_phase('imports', main_start - SCRIPT_START + options_start - libtmux_start)
+        TIMINGS.add_phase('options', options_time)
+        # The timings are logged at info level
+        logging.getLogger().setLevel(min(log_level, logging.INFO))
+
+    if options.control_mode:
+        server = ControlModeServer(server)
+
+    if TIMINGS.enabled:
+        TIMINGS.instrument_server(server)
+
     if args.print_programs:
         print_programs(server, options)
-    elif args.enable_rename_hook:
-        enable_user_rename_hook(server)
-    elif args.disable_rename_hook:
-        disable_user_rename_hook(server)
     elif args.post_restore:
-        post_restore(server)
+        post_restore(server, options)
+    elif args.daemon:
+        run_daemon(server, options)
+    elif args.events:
+        run_events(server, options)
+    elif args.watch:
+        run_watcher(server, options)
+    elif options.debounce_ms > 0:
+        from debounce import debounce
+
+        debounce(
+            get_server_runtime_file(server, 'trigger'),
+            options.debounce_ms / 1000,
+            lambda: rename_windows(server, options, args.session_id, args.all_sessions),
+        )
     else:
-        rename_windows(server, options)
+        rename_windows(server, options, args.session_id, args.all_sessions)
+
+    if isinstance(server, ControlModeServer):
+        server.close()
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
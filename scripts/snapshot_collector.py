@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from process_utils import RunningPrograms, get_running_programs_ps, is_proc_available, read_ps, start_ps
+from tmux_snapshot import PaneInfo, list_panes
+
+
+class Snapshot(NamedTuple):
+    panes: List[PaneInfo]
+    # Children of every process from `ps`, None with /proc (or when the panes didn't need `ps`)
+    ps_programs: Optional[RunningPrograms]
+
+
+def collect_snapshot(
+    server: Any,
+    session_id: Optional[str] = None,
+    all_sessions: bool = False,
+    needs_ps: Optional[Callable[[List[PaneInfo]], bool]] = None,
+) -> Snapshot:
+    """Collect the panes, and the `ps` output when there is no /proc to read the programs from
+
+    `ps` runs while the panes are listed, so the run waits for the slowest of the two instead of both.
+
+    Args:
+        session_id (Optional[str]): session to list the panes of, None for the current session
+        all_sessions (bool): list the panes of all the sessions
+        needs_ps (Optional[Callable[[List[PaneInfo]], bool]]): check if the listed panes need `ps`,
+            it runs after the listing only if they do (instead of while they are listed)
+    """
+    if is_proc_available():
+        # The programs are read from /proc after the listing, by the pids of the panes
+        return Snapshot(list_panes(server, session_id, all_sessions), None)
+
+    if needs_ps is not None:
+        panes = list_panes(server, session_id, all_sessions)
+        return Snapshot(panes, get_running_programs_ps() if needs_ps(panes) else None)
+
+    with start_ps() as ps_process:
+        panes = list_panes(server, session_id, all_sessions)
+        return Snapshot(panes, read_ps(ps_process))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Pattern, Tuple
+
+# Characters with a special meaning outside of a character class
+REGEX_SPECIAL_CHARS = '.^$*+?{}[]()|\\'
+OPTIONAL_QUANTIFIERS = ('?', '*', '{')
+
+
+def get_literal_prefix(pattern: Pattern) -> Tuple[str, bool]:
+    """Get the literal text every match of the pattern starts with
+
+    Returns:
+        The literal prefix (empty if there is none), True if the pattern matches only at the start of the string
+
+    E.g:
+        ^/usr/bin/(.+) -> ('/usr/bin/', True)
+        nvim\\.app -> ('nvim.app', False)
+        ab?c -> ('a', False)
+        .+ipython([32]) -> ('', False)
+    """
+    source = pattern.pattern
+    if not isinstance(source, str) or '|' in source or pattern.flags & (re.IGNORECASE | re.VERBOSE):
+        # Alternations and flags change the meaning of the text
+        return '', False
+
+    anchored = source.startswith('^') and not pattern.flags & re.MULTILINE
+    i = 1 if source.startswith('^') else 0
+    prefix = ''
+    while i < len(source):
+        if source[i] == '\\':
+            # Escaped punctuation is literal, escapes like \d or \g aren't
+            if i + 1 >= len(source) or source[i + 1].isalnum():
+                break
+            char, next_i = source[i + 1], i + 2
+        elif source[i] in REGEX_SPECIAL_CHARS:
+            break
+        else:
+            char, next_i = source[i], i + 1
+
+        # A char that may be repeated 0 times isn't required
+        if source[next_i : next_i + 1] in OPTIONAL_QUANTIFIERS:
+            break
+
+        prefix += char
+        i = next_i
+
+    return prefix, anchored
+
+
+class SubstituteRules(List[Tuple[Pattern, Any]]):
+    """
+    Compiled substitute sets, a list of (compiled pattern, replacement) applied in order like sequential `re.sub`.
+
+    Rules with a literal prefix are skipped without running the regex when the name can't match them: anchored rules
+    are indexed by the first char of their prefix, other rules are checked with a substring test.
+    `hits` counts the names each rule matched.
+    """
+
+    def __init__(self, substitute_sets: Iterable[Tuple[Any, Any]] = ()):
+        super().__init__((re.compile(pattern), replacement) for pattern, replacement in substitute_sets)
+        self.hits = [0] * len(self)
+
+        self._always: List[int] = []  # Rules without a literal prefix
+        self._anchored_index: Dict[str, List[Tuple[int, str]]] = {}  # First char -> (rule, prefix)
+        self._unanchored: List[Tuple[int, str]] = []  # (rule, literal every match starts with)
+        for i, (pattern, _) in enumerate(self):
+            prefix, anchored = get_literal_prefix(pattern)
+            if len(prefix) == 0:
+                self._always.append(i)
+            elif anchored:
+                self._anchored_index.setdefault(prefix[0], []).append((i, prefix))
+            else:
+                self._unanchored.append((i, prefix))
+
+    def get_candidates(self, name: str, after: int = -1) -> List[int]:
+        """Get the rules (in order) after the `after` rule that may match the name"""
+        candidates = [i for i in self._always if i > after]
+        candidates += [
+            i for i, prefix in self._anchored_index.get(name[:1], []) if i > after and name.startswith(prefix)
+        ]
+        candidates += [i for i, literal in self._unanchored if i > after and literal in name]
+        candidates.sort()
+        return candidates
+
+    def apply(self, name: str) -> str:
+        candidates = self.get_candidates(name)
+        next_candidate = 0
+        while next_candidate < len(candidates):
+            i = candidates[next_candidate]
+            pattern, replacement = self[i]
+            new_name, matches = pattern.subn(replacement, name)
+            logging.debug(f'after pattern={pattern} replacement={replacement}: {new_name}')
+
+            next_candidate += 1
+            if matches > 0:
+                self.hits[i] += 1
+            if new_name != name:
+                name = new_name
+                # Later rules may match the new name
+                candidates = self.get_candidates(name, i)
+                next_candidate = 0
+
+        return name
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from process_utils import PROC_DIR, read_proc_start_time
+from tmux_transport import ControlModeServer
+
+
+def get_process_age() -> Optional[float]:
+    """Seconds since this process started (interpreter start included), None without /proc"""
+    start_time = read_proc_start_time(os.getpid())
+    try:
+        with open(f'{PROC_DIR}/uptime') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    if start_time is None:
+        return None
+
+    return max(uptime - start_time / os.sysconf('SC_CLK_TCK'), 0)
+
+
+def format_breakdown(record: Dict[str, Any]) -> str:
+    """Format a run record as a table
+
+    E.g:
+        total                 52.1 ms
+          startup             30.0 ms   58%
+          list_panes           4.2 ms    8%
+        tmux commands: 38 (7 invocations), subprocesses: 8
+    """
+    lines = [f'{"total":18} {record["total_ms"]:7.1f} ms']
+    for name, ms in record['phases_ms'].items():
+        share = ms / record['total_ms'] * 100 if record['total_ms'] else 0
+        lines.append(f'  {name:16} {ms:7.1f} ms {share:4.0f}%')
+
+    counters = [f'tmux commands: {record.get("tmux_commands", 0)} ({record.get("tmux_invocations", 0)} invocations)']
+    if 'subprocesses' in record:
+        counters.append(f'subprocesses: {record["subprocesses"]}')
+    lines.append(', '.join(counters))
+    return '\n'.join(lines)
+
+
+class Timings:
+    """
+    Opt-in timings of the phases of a run and counters of the tmux commands and subprocesses it spawned.
+
+    Phases are measured only when enabled, each run is reported as one json line in the log.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.print_breakdown = False
+        self.run_start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def enable(self, print_breakdown: bool, script_start: float):
+        """Start measuring, the first run includes the interpreter start before `script_start`"""
+        self.enabled = True
+        self.print_breakdown = print_breakdown
+
+        now = time.perf_counter()
+        process_age = get_process_age()
+        if process_age is not None:
+            self.add_phase('startup', max(process_age - (now - script_start), 0))
+        self.run_start = script_start - self.phases.get('startup', 0)
+
+        if hasattr(sys, 'addaudithook'):
+            # Python 3.8+, counts subprocesses spawned by libtmux and ps alike
+            self.counters['subprocesses'] = 0
+            sys.addaudithook(self._audit)
+
+    def _audit(self, event: str, _):
+        if event == 'subprocess.Popen' and self.enabled:
+            self.count('subprocesses')
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0) + seconds
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def instrument_server(self, server: Any):
+        """Count the tmux commands sent through the server"""
+        if isinstance(server, ControlModeServer):
+            cmd_many = server.cmd_many
+
+            def counted_cmd_many(commands: List[List[Any]]) -> List[Any]:
+                self.count('tmux_commands', len(commands))
+                return cmd_many(commands)
+
+            server.cmd_many = counted_cmd_many
+            return
+
+        cmd = server.cmd
+
+        def counted_cmd(*args: Any) -> Any:
+            self.count('tmux_invocations')
+            self.count('tmux_commands', args.count(';') + 1)
+            return cmd(*args)
+
+        server.cmd = counted_cmd
+
+    def report(self):
+        """Log the run as one json line (and print its breakdown if asked), then start a new run"""
+        if not self.enabled:
+            return
+
+        total = time.perf_counter() - self.run_start
+        phases_ms = {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()}
+        phases_ms['other'] = round(max(total * 1000 - sum(phases_ms.values()), 0), 3)
+        record = {'total_ms': round(total * 1000, 3), 'phases_ms': phases_ms, **self.counters}
+
+        logging.info(f'timings {json.dumps(record)}')
+        if self.print_breakdown:
+            print(format_breakdown(record))
+
+        self.run_start = time.perf_counter()
+        self.phases = {}
+        self.counters = {name: 0 for name in self.counters}
+
+
+# Timings of the current process
+TIMINGS = Timings()
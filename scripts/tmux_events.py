@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import logging
+import os
+import select
+import subprocess
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from tmux_transport import CONTROL_MODE_FLAGS, REPLY_GUARD, format_command, get_tmux_args
+
+if TYPE_CHECKING:
+    from libtmux.server import Server
+
+SUBSCRIPTION_NAME = 'tmux_window_name'
+# Program and directory of the active pane of each window, tmux checks the subscriptions once a second
+SUBSCRIPTION_FORMAT = '#{?pane_active,#{pane_current_command} #{pane_current_path},}'
+# Seconds between tmux checks of the subscriptions
+SUBSCRIPTION_PERIOD = 1.0
+# Seconds to keep checking the programs of an added window, for the slow shells startups
+SETTLE_TIMEOUT = 5
+ATTACH_TIMEOUT = 5
+READ_SIZE = 65536
+
+# Notifications of a window, its id is the first argument
+WINDOW_NOTIFICATIONS = (
+    '%window-add',
+    '%window-close',
+    '%window-pane-changed',
+    '%unlinked-window-add',
+    '%unlinked-window-close',
+)
+
+# Notifications of an added window, its id is the first argument
+ADDED_WINDOW_NOTIFICATIONS = ('%window-add', '%unlinked-window-add')
+
+
+def get_event_targets(lines: List[str]) -> Tuple[Set[str], Set[str]]:
+    """Get the windows and sessions affected by control mode notifications
+
+    Returns:
+        Windows ids, sessions ids
+
+    E.g:
+        ['%window-add @7', '%session-window-changed $1 @3', '%output %1 ls'] -> ({'@7'}, {'$1'})
+    """
+    windows_ids: Set[str] = set()
+    sessions_ids: Set[str] = set()
+    for line in lines:
+        name, *args = line.split(' ')
+        if name in WINDOW_NOTIFICATIONS and args:
+            windows_ids.add(args[0])
+        elif name == '%session-window-changed' and args:
+            sessions_ids.add(args[0])
+        elif name == '%subscription-changed' and len(args) > 2 and args[0] == SUBSCRIPTION_NAME:
+            # %subscription-changed <name> <session id> <window id> <window index> <pane id> ... : <value>
+            windows_ids.add(args[2])
+
+    return windows_ids, sessions_ids
+
+
+def get_added_windows(lines: List[str]) -> Set[str]:
+    """Get the windows added by control mode notifications
+
+    E.g:
+        ['%window-add @7', '%window-close @3'] -> {'@7'}
+    """
+    added_windows: Set[str] = set()
+    for line in lines:
+        name, *args = line.split(' ')
+        if name in ADDED_WINDOW_NOTIFICATIONS and args:
+            added_windows.add(args[0])
+
+    return added_windows
+
+
+class SettlingWindows:
+    """Windows added lately, their shell may still run startup programs (E.g: `pyenv init -`) and nothing notifies
+    when these exit (the subscription value is the same shell)
+
+    The windows are checked every subscription period, until their programs fingerprint is the same on two checks
+    in a row, or for SETTLE_TIMEOUT after they were added.
+    """
+
+    def __init__(self):
+        # Window id -> (added time, programs fingerprint of the last check, None before the first check)
+        self.windows: Dict[str, Tuple[float, Any]] = {}
+        self.check_time = 0.0
+
+    def add(self, windows_ids: Set[str], now: float):
+        if len(windows_ids) == 0:
+            return
+
+        for window_id in windows_ids:
+            self.windows[window_id] = (now, None)
+        self.check_time = now + SUBSCRIPTION_PERIOD
+
+    def get_timeout(self, now: float) -> Optional[float]:
+        """Get the seconds until the next check, None without settling windows"""
+        if len(self.windows) == 0:
+            return None
+
+        return max(self.check_time - now, 0)
+
+    def is_due(self, now: float) -> bool:
+        return len(self.windows) > 0 and now >= self.check_time
+
+    def check(self, fingerprints: Dict[str, Any], now: float) -> Set[str]:
+        """Get the windows to rename again, their programs changed since the last check
+
+        Args:
+            fingerprints (Dict[str, Any]): programs fingerprint of each settling window, the closed windows are left out
+        """
+        changed_windows = set()
+        for window_id, (added_time, fingerprint) in list(self.windows.items()):
+            new_fingerprint = fingerprints.get(window_id)
+            if new_fingerprint != fingerprint and window_id in fingerprints:
+                changed_windows.add(window_id)
+
+            if new_fingerprint == fingerprint or window_id not in fingerprints or now - added_time >= SETTLE_TIMEOUT:
+                del self.windows[window_id]
+            else:
+                self.windows[window_id] = (added_time, new_fingerprint)
+
+        self.check_time = now + SUBSCRIPTION_PERIOD
+        return changed_windows
+
+    def clear(self):
+        self.windows = {}
+
+
+def list_windows_sessions(server: Server) -> Dict[str, Set[str]]:
+    """Get the sessions of every window, a window can be linked to multiple sessions"""
+    windows_sessions: Dict[str, Set[str]] = {}
+    for line in server.cmd('list-windows', '-a', '-F', '#{window_id} #{session_id}').stdout:
+        window_id, session_id = line.split(' ')
+        windows_sessions.setdefault(window_id, set()).add(session_id)
+
+    return windows_sessions
+
+
+class NotificationReader:
+    """
+    A `tmux -C` client attached to a session, reading its notifications.
+
+    tmux notifies the control client of changes in the windows of its session (E.g: %window-pane-changed),
+    of windows of other sessions as %unlinked-window-*, and subscribes it to the active pane program and directory
+    of every window in its session.
+    """
+
+    def __init__(self, server: Server, target: str):
+        self.server = server
+        self.target = target
+        self._process: Optional['subprocess.Popen[bytes]'] = None
+        self._buffer = b''
+        self._reply: Optional[Tuple[str, str]] = None  # Time and command number of the reply being read
+        self._reply_output: List[str] = []
+        self.replies = 0
+        self.failed_replies = 0
+
+    def __enter__(self) -> 'NotificationReader':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def start(self) -> bool:
+        try:
+            self._process = subprocess.Popen(
+                [*get_tmux_args(self.server), '-C', 'attach-session', '-f', CONTROL_MODE_FLAGS, '-t', self.target],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError:
+            logging.exception('failed to start tmux control mode')
+            return False
+
+        # Commands sent before the attach-session reply run without a session
+        deadline = time.monotonic() + ATTACH_TIMEOUT
+        while self.replies == 0:
+            if time.monotonic() >= deadline or self.read(ATTACH_TIMEOUT) is None:
+                break
+
+        if self.replies == 0 or self.failed_replies > 0:
+            logging.warning(f'failed to attach tmux control mode to {self.target}')
+            self.close()
+            return False
+
+        subscription = format_command(['refresh-client', '-B', f'{SUBSCRIPTION_NAME}:%*:{SUBSCRIPTION_FORMAT}'])
+        try:
+            self._process.stdin.write(subscription.encode() + b'\n')  # type: ignore
+            self._process.stdin.flush()  # type: ignore
+        except OSError:
+            logging.exception('tmux control mode exited')
+            self.close()
+            return False
+
+        logging.debug(f'listening to tmux notifications of {self.target}')
+        return True
+
+    def close(self):
+        if self._process is None:
+            return
+
+        try:
+            self._process.stdin.close()  # type: ignore
+            self._process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+        self._process = None
+
+    def read(self, timeout: Optional[float]) -> Optional[List[str]]:
+        """Wait for output of the client
+
+        Args:
+            timeout (Optional[float]): seconds to wait, None to wait until there is output
+
+        Returns:
+            The notifications read, can be empty (timeout or only command replies). None if the client exited
+        """
+        if self._process is None:
+            return None
+
+        fd = self._process.stdout.fileno()  # type: ignore
+        if not select.select([fd], [], [], timeout)[0]:
+            return []
+
+        data = os.read(fd, READ_SIZE)
+        if len(data) == 0:
+            return None
+
+        *lines, self._buffer = (self._buffer + data).split(b'\n')
+        notifications = []
+        for line in lines:
+            notification = self._read_line(line.decode('utf-8', 'backslashreplace'))
+            if notification is not None and notification.split(' ')[0] == '%exit':
+                return None
+            if notification is not None:
+                notifications.append(notification)
+
+        return notifications
+
+    def _read_line(self, line: str) -> Optional[str]:
+        """Track the command replies, return the line if it's a notification"""
+        guard = REPLY_GUARD.match(line)
+        if self._reply is None:
+            if guard is not None and guard.group(1) == 'begin':
+                self._reply = guard.group(2, 3)
+                self._reply_output = []
+                return None
+            return line
+
+        if guard is not None and guard.group(1) != 'begin' and guard.group(2, 3) == self._reply:
+            if guard.group(1) == 'error':
+                logging.warning(f'tmux control mode command failed: {self._reply_output}')
+                self.failed_replies += 1
+            self._reply = None
+            self.replies += 1
+            return None
+
+        self._reply_output.append(line)
+        return None
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from libtmux.server import Server
+
+# Same separator as libtmux, not expected in paths and window names
+FORMAT_SEPARATOR = '␞'
+
+
+class PaneInfo(NamedTuple):
+    session_id: str
+    window_id: str
+    pane_id: str
+    pane_active: bool
+    pane_pid: Optional[int]
+    pane_current_path: Optional[str]
+    pane_current_command: str
+    window_name: str
+    window_enabled: str = ''  # Raw @tmux_window_name_enabled window option
+    automatic_rename: bool = False
+    pane_start_command: str = ''  # Empty for the default shell, the command the pane process started with otherwise
+
+
+PANE_FORMAT = FORMAT_SEPARATOR.join(
+    [
+        '#{session_id}',
+        '#{window_id}',
+        '#{pane_id}',
+        '#{pane_active}',
+        '#{pane_pid}',
+        '#{pane_current_path}',
+        '#{pane_current_command}',
+        '#{window_name}',
+        '#{@tmux_window_name_enabled}',
+        '#{automatic-rename}',
+        # Last, the command may contain the separator
+        '#{pane_start_command}',
+    ]
+)
+
+
+def parse_pane_line(line: str) -> PaneInfo:
+    (
+        session_id,
+        window_id,
+        pane_id,
+        active,
+        pid,
+        current_path,
+        current_command,
+        window_name,
+        enabled,
+        automatic_rename,
+        start_command,
+    ) = line.split(FORMAT_SEPARATOR, 10)
+    return PaneInfo(
+        session_id,
+        window_id,
+        pane_id,
+        active == '1',
+        int(pid) if pid else None,
+        current_path or None,
+        current_command,
+        window_name,
+        enabled,
+        automatic_rename == '1',
+        start_command,
+    )
+
+
+def list_panes(server: Server, session_id: Optional[str] = None, all_sessions: bool = False) -> List[PaneInfo]:
+    """List panes with a single list-panes query
+
+    Args:
+        session_id (Optional[str]): session to list the panes of, None for the current session
+        all_sessions (bool): list the panes of all the sessions
+    """
+    arguments = ['list-panes', '-F', PANE_FORMAT]
+    if all_sessions:
+        arguments.append('-a')
+    else:
+        arguments.append('-s')
+        if session_id is not None:
+            arguments += ['-t', session_id]
+
+    return [parse_pane_line(line) for line in server.cmd(*arguments).stdout]
+
+
+def list_windows_automatic_rename(server: Server) -> Dict[str, bool]:
+    """Get the automatic-rename option of every window of all the sessions, with a single list-windows query"""
+    windows_automatic_rename = {}
+    for line in server.cmd('list-windows', '-a', '-F', '#{window_id} #{automatic-rename}').stdout:
+        window_id, automatic_rename = line.split(' ')
+        windows_automatic_rename[window_id] = automatic_rename == '1'
+
+    return windows_automatic_rename
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import subprocess
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from libtmux.server import Server
+
+# %begin <time> <command number> <flags>, closed by %end or %error with the same time and command number
+REPLY_GUARD = re.compile(r'^%(begin|end|error) (\d+) (\d+) (\d+)$')
+CONTROL_MODE_FLAGS = 'no-output,ignore-size'
+
+
+@dataclass
+class CmdResult:
+    """Same interface as libtmux.common.tmux_cmd"""
+
+    cmd: List[str]
+    stdout: List[str] = field(default_factory=list)
+    stderr: List[str] = field(default_factory=list)
+    returncode: int = 0
+
+
+def quote_argument(arg: Any) -> str:
+    """Quote an argument for the tmux command parser
+
+    E.g:
+        it's #{session_id} -> 'it'\\''s #{session_id}'
+    """
+    return "'" + str(arg).replace("'", "'\\''") + "'"
+
+
+def format_command(args: Sequence[Any]) -> str:
+    return ' '.join(quote_argument(arg) for arg in args)
+
+
+def parse_reply(lines: Iterator[str]) -> Optional[CmdResult]:
+    """Read the next command reply, skipping notifications
+
+    Args:
+        lines (Iterator[str]): control mode output lines without line endings
+
+    Returns:
+        CmdResult with the reply output (cmd is left empty), None if the output ended
+    """
+    for line in lines:
+        begin = REPLY_GUARD.match(line)
+        if begin is None or begin.group(1) != 'begin':
+            # Notification
+            continue
+
+        output = []
+        for line in lines:
+            end = REPLY_GUARD.match(line)
+            if end is not None and end.group(1) != 'begin' and end.group(2, 3) == begin.group(2, 3):
+                # Same as tmux_cmd, remove trailing newlines
+                while output and output[-1] == '':
+                    output.pop()
+
+                if end.group(1) == 'error':
+                    return CmdResult([], stderr=output, returncode=1)
+                return CmdResult([], stdout=output)
+
+            output.append(line)
+
+        return None
+
+    return None
+
+
+def get_tmux_args(server: Server) -> List[str]:
+    """Get the tmux binary and socket arguments of the server"""
+    args = [server.tmux_bin or 'tmux']
+    if server.socket_name:
+        args.append(f'-L{server.socket_name}')
+    if server.socket_path:
+        args.append(f'-S{server.socket_path}')
+    return args
+
+
+def get_attach_target(server: Server) -> Optional[str]:
+    """Get the target to attach a control mode client to, the caller's pane or the current session"""
+    target = os.environ.get('TMUX_PANE')
+    if target is None:
+        out = server.cmd('display-message', '-p', '#{session_id}').stdout
+        if len(out) == 0:
+            return None
+        target = out[0]
+
+    return target
+
+
+class ControlModeServer:
+    """
+    Proxy of a libtmux Server that sends `cmd` over one persistent `tmux -C` connection.
+
+    The connection is attached to the caller's session (TMUX_PANE, or the current session) so commands without a
+    target resolve the same as in a forked tmux client.
+    Falls back to `server.cmd` if the connection can't be made or breaks.
+    """
+
+    def __init__(self, server: Server):
+        self.server = server
+        self._process: Optional['subprocess.Popen[str]'] = None
+        self._lines: Optional[Iterator[str]] = None
+        self._broken = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.server, name)
+
+    def __enter__(self) -> 'ControlModeServer':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def connect(self) -> bool:
+        if self._process is not None:
+            return True
+        if self._broken:
+            return False
+
+        target = get_attach_target(self.server)
+        if target is None:
+            self._broken = True
+            return False
+
+        try:
+            self._process = subprocess.Popen(
+                [*get_tmux_args(self.server), '-C', 'attach-session', '-f', CONTROL_MODE_FLAGS, '-t', target],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                errors='backslashreplace',
+            )
+        except OSError:
+            logging.exception('failed to start tmux control mode')
+            self._broken = True
+            return False
+
+        self._lines = (line.rstrip('\n') for line in self._process.stdout)  # type: ignore
+
+        # Reply of attach-session itself
+        reply = parse_reply(self._lines)
+        if reply is None or reply.returncode != 0:
+            logging.warning(f'failed to attach tmux control mode to {target}, falling back to tmux commands')
+            self.close()
+            self._broken = True
+            return False
+
+        logging.debug(f'tmux control mode attached to {target}')
+        return True
+
+    def close(self):
+        if self._process is None:
+            return
+
+        try:
+            self._process.stdin.close()  # type: ignore
+            self._process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+        self._process = None
+        self._lines = None
+
+    def cmd(self, cmd: str, *args: Any) -> Any:
+        return self.cmd_many([[cmd, *args]])[0]
+
+    def cmd_many(self, commands: List[List[Any]]) -> List[Any]:
+        """Send all commands at once and read their replies in order"""
+        if any('\n' in str(arg) for command in commands for arg in command) or not self.connect():
+            return [self.server.cmd(*command) for command in commands]
+
+        results: List[Any] = []
+        try:
+            self._process.stdin.write(''.join(format_command(command) + '\n' for command in commands))  # type: ignore
+            self._process.stdin.flush()  # type: ignore
+
+            for command in commands:
+                reply = parse_reply(self._lines)  # type: ignore
+                if reply is None:
+                    raise EOFError('tmux control mode exited')
+                reply.cmd = [str(arg) for arg in command]
+                results.append(reply)
+        except (OSError, EOFError):
+            # Reconnect on the next command
+            logging.exception('tmux control mode connection broke, falling back to tmux commands')
+            self.close()
+            return results + [self.server.cmd(*command) for command in commands[len(results) :]]
+
+        return results
+
+
+def escape_cli_argument(arg: Any) -> str:
+    """Escape an argument for a `tmux a \\; b` command line, an argument ending with ; would end the command"""
+    arg = str(arg)
+    if arg.endswith(';'):
+        return arg[:-1] + '\\;'
+    return arg
+
+
+def chain_commands(commands: List[List[Any]]) -> List[str]:
+    """Chain commands to arguments of a single tmux invocation
+
+    E.g:
+        [['rename-window', '-t', '@1', 'a'], ['set-option', '-wq', 'b']] ->
+        ['rename-window', '-t', '@1', 'a', ';', 'set-option', '-wq', 'b']
+    """
+    args: List[str] = []
+    for command in commands:
+        if args:
+            args.append(';')
+        args += [escape_cli_argument(arg) for arg in command]
+    return args
+
+
+class TmuxCommandBatch:
+    """
+    Collects tmux commands (same `cmd` interface as Server, without output) and submits them at once,
+    over the control mode connection if there is one, otherwise as one tmux invocation.
+    """
+
+    def __init__(self):
+        self.commands: List[List[Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def cmd(self, cmd: str, *args: Any):
+        self.commands.append([cmd, *args])
+
+    def submit(self, server: Any) -> int:
+        """Submit the collected commands
+
+        Returns:
+            Number of commands submitted
+        """
+        commands, self.commands = self.commands, []
+        if len(commands) == 0:
+            return 0
+
+        if isinstance(server, ControlModeServer):
+            server.cmd_many(commands)
+        else:
+            result = server.cmd(*chain_commands(commands))
+            if result.returncode != 0 and len(commands) > 1:
+                # tmux stops at the first failing command (E.g: window closed meanwhile), run them one by one
+                logging.warning(f'batched tmux commands failed: {result.stderr}, running them one by one')
+                for command in commands:
+                    server.cmd(*command)
+
+        logging.debug(f'submitted {len(commands)} tmux commands at once')
+        return len(commands)
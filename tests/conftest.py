@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+
+import sys
+
+import pytest
+
+sys.path.append('scripts/')
+
+import rename_session_windows
+
+
+@pytest.fixture(autouse=True)
+def snapshot_file(tmp_path, monkeypatch):
+    """Keep the files shared between runs (options snapshot, names cache, layout fingerprints) out of the real ones"""
+    monkeypatch.setattr(rename_session_windows, 'get_server_socket_path', lambda _: str(tmp_path / 'default'))
+    return tmp_path / f'tmux-window-name-default.{rename_session_windows.OPTIONS_SNAPSHOT_FILE}'
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import json
+import sys
+
+sys.path.append('scripts/')
+sys.path.append('benchmarks/')
+
+from bench_rename import BASELINES_FILE, Result, check_results, run_benchmarks
+from bench_startup import DEFERRED_MODULES, ImportTime, check_startup, measure_imports, parse_importtime
+from fake_tmux import Scenario
+
+
+def test_fake_server_renames():
+    server = Scenario(4, 10).make_server()
+    server.cmd('rename-window', '-t', '@1', 'a;', ';', 'set-option', '-wq', '-t', '@1', 'automatic-rename', 'on')
+    assert server.windows['@1'].window_name == 'a;'
+    assert server.invocations == 1
+    assert server.commands == 2
+    assert server.cmd('list-windows', '-F', '#{window_id} #{window_name}', '-t', '$0').stdout[:2] == ['@0 zsh', '@1 a;']
+
+
+def test_no_command_count_regressions():
+    with open(BASELINES_FILE) as f:
+        baselines = json.load(f)
+
+    results = run_benchmarks([10, 100], [100], ['ps'], 1)
+    # Wall times are checked by `benchmarks/bench_rename.py --check --tolerance 2`, they depend on the machine
+    assert check_results(results, baselines) == []
+
+
+def test_wall_time_checked_with_tolerance():
+    results = {'rename_windows': Result(30.0, 10, 1, 1)}
+    baselines = {'rename_windows': {'wall_ms': 10.0, 'tmux_commands': 10, 'tmux_invocations': 1, 'subprocesses': 1}}
+    assert check_results(results, baselines) == []
+    assert check_results(results, baselines, 2) == ['rename_windows: wall_ms 30.0 > 10.0 * 2']
+
+
+def test_parse_importtime():
+    output = """import time: self [us] | cumulative | imported package
+import time:       702 |       5913 |   tempfile
+import time:      5406 |      77375 | rename_session_windows"""
+    assert parse_importtime(output) == [
+        ImportTime('tempfile', 702, 5913, 1),
+        ImportTime('rename_session_windows', 5406, 77375, 0),
+    ]
+
+
+def test_startup_defers_imports():
+    imports_by_module = {module: measure_imports(module, 0) for module in DEFERRED_MODULES}
+    # Import times are checked by `benchmarks/bench_startup.py --check`, they depend on the machine
+    assert [r for r in check_startup(imports_by_module) if 'import time' not in r] == []
+
+
+def test_unchanged_layout_exits_early():
+    results = run_benchmarks([10], [100], ['proc'], 1)
+    changed, unchanged = results['rename_windows/w10-p100/proc'], results['rename_windows_unchanged/w10-p100/proc']
+    # Only the options and panes listings, without the programs and the renames
+    assert unchanged.tmux_commands == 2
+    assert unchanged.subprocesses == unchanged.tmux_invocations
+    assert changed.tmux_commands > unchanged.tmux_commands
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import sys
+import threading
+import time
+from typing import List
+
+sys.path.append('scripts/')
+
+from debounce import debounce, trigger
+
+QUIET_PERIOD = 0.05
+
+
+def test_single_trigger_runs(tmp_path):
+    runs: List[int] = []
+    assert debounce(str(tmp_path / 'trigger'), QUIET_PERIOD, lambda: runs.append(1))
+    assert runs == [1]
+
+
+def test_burst_runs_once(tmp_path):
+    trigger_path = str(tmp_path / 'trigger')
+    runs: List[int] = []
+    results: List[bool] = []
+
+    def hook(i: int):
+        results.append(debounce(trigger_path, QUIET_PERIOD, lambda: runs.append(i)))
+
+    threads = []
+    for i in range(5):
+        threads.append(threading.Thread(target=hook, args=(i,)))
+        threads[-1].start()
+        time.sleep(QUIET_PERIOD / 5)
+
+    for thread in threads:
+        thread.join()
+
+    # Only the last trigger of the burst runs
+    assert runs == [4]
+    assert sorted(results) == [False] * 4 + [True]
+
+
+def test_trigger_during_run_runs_once(tmp_path):
+    trigger_path = str(tmp_path / 'trigger')
+    runs: List[int] = []
+
+    def run():
+        runs.append(1)
+        # Another hook triggered while renaming, its own process runs for it
+        trigger(trigger_path)
+
+    assert debounce(trigger_path, QUIET_PERIOD, run)
+    assert runs == [1]
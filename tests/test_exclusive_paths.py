@@ -234,3 +234,24 @@ def test_program_mixed(ignore_program_diffs: bool):
         ],
         ignore_program_diffs
     )
+
+
+def test_three_sharing_suffix(ignore_program_diffs: bool):
+    _check(
+        [
+            ('x/a/dir', None, 'x/a/dir'),
+            ('y/a/dir', None, 'y/a/dir'),
+            ('b/dir', None, 'b/dir'),
+        ],
+        ignore_program_diffs
+    )
+
+
+def test_many_panes(ignore_program_diffs: bool):
+    expected = []
+    for i in range(500):
+        expected.append((f'/home/user/project{i}/src', None, f'project{i}/src'))
+        expected.append((f'/home/user/project{i}/tests/unit', 'p1', f'project{i}/tests/unit'))
+    expected.append(('/home/user/unique', None, 'unique'))
+    expected.append(('/home/user/project7/src', None, 'project7/src'))
+    _check(expected, ignore_program_diffs)
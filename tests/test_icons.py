@@ -107,7 +107,7 @@ def test_get_program_icon_with_colon():
 def test_custom_icons_from_dictionary():
     """Test that custom icons can be parsed from a dictionary"""
     server = FakeServer()
-    server.cmd.return_value.stdout = ['{"python": "🐍", "custom": "📦", "nvim": "󰹻"}']
+    server.cmd.return_value.stdout = ['@tmux_window_name_custom_icons \'{"python": "🐍", "custom": "📦", "nvim": "󰹻"}\'']
     options = Options.from_options(server)
     assert get_program_icon('python', options) == '🐍'
     assert get_program_icon('custom', options) == '📦'
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import json
+import sys
+
+sys.path.append('scripts/')
+
+import layout_fingerprint
+from layout_fingerprint import get_layout_fingerprints, load_layout_fingerprints, save_layout_fingerprints
+from tmux_snapshot import PaneInfo
+
+PANES = [
+    PaneInfo('$0', '@0', '%0', True, 100, '/home/user/a', 'nvim', 'a', '1'),
+    PaneInfo('$0', '@0', '%1', False, 101, '/home/user', 'zsh', 'a', '1'),
+    PaneInfo('$1', '@1', '%2', True, 102, '/home/user/b', 'zsh', 'b', '1'),
+]
+PROGRAMS = {100: ((200, 5000),), 102: ()}
+
+
+def test_fingerprints_change_with_the_layout():
+    fingerprints = get_layout_fingerprints(PANES, PROGRAMS, 'hash')
+    assert list(fingerprints) == ['$0', '$1']
+    assert get_layout_fingerprints(PANES, PROGRAMS, 'hash') == fingerprints
+
+    # Inactive panes don't change the names
+    inactive_moved = [PANES[0], PANES[1]._replace(pane_current_path='/tmp'), PANES[2]]
+    assert get_layout_fingerprints(inactive_moved, PROGRAMS, 'hash') == fingerprints
+
+    for panes, programs, options_hash in [
+        ([PANES[0]._replace(pane_current_path='/tmp'), *PANES[1:]], PROGRAMS, 'hash'),
+        ([PANES[0]._replace(window_enabled='0'), *PANES[1:]], PROGRAMS, 'hash'),
+        ([PANES[0]._replace(window_name='b'), *PANES[1:]], PROGRAMS, 'hash'),
+        (PANES, {**PROGRAMS, 100: ((201, 5100),)}, 'hash'),
+        (PANES, PROGRAMS, 'other_hash'),
+    ]:
+        changed = get_layout_fingerprints(panes, programs, options_hash)
+        assert changed['$0'] != fingerprints['$0']
+        assert changed['$1'] == fingerprints['$1'] or options_hash != 'hash'
+
+
+def test_fingerprints_with_renames():
+    renamed = get_layout_fingerprints(PANES, PROGRAMS, 'hash', {'@0': 'nvim'})
+    listed_after_rename = [PANES[0]._replace(window_name='nvim'), *PANES[1:]]
+    assert get_layout_fingerprints(listed_after_rename, PROGRAMS, 'hash') == renamed
+
+
+def test_save_and_load(tmp_path, monkeypatch):
+    path = str(tmp_path / 'layouts.json')
+    assert load_layout_fingerprints(path) == {}
+
+    save_layout_fingerprints(path, {'s:$0': 'a', 's:$1': 'b'})
+    save_layout_fingerprints(path, {'s:$0': 'c'}, load_layout_fingerprints(path))
+    assert load_layout_fingerprints(path) == {'s:$1': 'b', 's:$0': 'c'}
+
+    # Least recently renamed sessions are dropped
+    monkeypatch.setattr(layout_fingerprint, 'MAX_LAYOUT_FINGERPRINTS', 1)
+    save_layout_fingerprints(path, {'s:$2': 'd'}, load_layout_fingerprints(path))
+    assert load_layout_fingerprints(path) == {'s:$2': 'd'}
+
+    with open(path, 'w') as f:
+        f.write('{corrupted')
+    assert load_layout_fingerprints(path) == {}
+
+    with open(path, 'w') as f:
+        json.dump([], f)
+    assert load_layout_fingerprints(path) == {}
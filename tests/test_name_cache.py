@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import sys
+from dataclasses import replace
+from unittest.mock import Mock
+
+sys.path.append('scripts/')
+
+import rename_session_windows
+from name_cache import NameCache
+from rename_session_windows import Options, get_program_window_name
+
+
+def test_lru_eviction():
+    cache = NameCache(2)
+    assert cache.get_or_compute(('a',), lambda: 1) == 1
+    assert cache.get_or_compute(('b',), lambda: 2) == 2
+    assert cache.get_or_compute(('a',), Mock(side_effect=AssertionError)) == 1
+    cache.get_or_compute(('c',), lambda: 3)
+    assert list(cache.entries) == [('a',), ('c',)]
+
+
+def test_disabled():
+    cache = NameCache(0)
+    assert cache.get_or_compute(('a',), lambda: 1) == 1
+    assert len(cache) == 0
+
+
+def test_persist(tmp_path):
+    path = str(tmp_path / 'names.json')
+    cache = NameCache(2)
+    cache.get_or_compute(('nvim', None, 'hash'), lambda: 'nvim')
+    cache.get_or_compute(('dir', '/a', 'hash'), lambda: None)
+    cache.save(path)
+
+    loaded = NameCache(1)
+    loaded.load(path)
+    assert loaded.entries == {('dir', '/a', 'hash'): None}
+
+    (tmp_path / 'names.json').write_text('{"corrupted": 1}')
+    corrupted = NameCache(2)
+    corrupted.load(path)
+    assert len(corrupted) == 0
+
+
+def test_invalidated_by_options(monkeypatch):
+    monkeypatch.setattr(rename_session_windows, 'NAME_CACHE', NameCache(10))
+    options = Options(substitute_sets=[('^nvim', 'vim')]).compile()
+    options.options_hash = 'a'
+    assert get_program_window_name('nvim file', options) == 'vim file'
+
+    changed_options = replace(options, substitute_sets=[('^nvim', 'neovim')]).compile()
+    changed_options.options_hash = 'b'
+    assert get_program_window_name('nvim file', changed_options) == 'neovim file'
+    assert get_program_window_name('nvim file', options) == 'vim file'
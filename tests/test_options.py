@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import json
+import re
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+sys.path.append('scripts/')
+
+import rename_session_windows
+from rename_session_windows import IconStyle, Options, get_options_hash, parse_option_value, parse_show_options
+
+
+def _fake_server(show_options_output):
+    server = Mock()
+    server.cmd.return_value.stdout = show_options_output
+    return server
+
+
+SHOW_OPTIONS_OUTPUT = [
+    'automatic-rename on',
+    '@tmux_window_name_custom_icons "{\\"python\\": \\"🐍\\", \\"x\\": \\"\\\\\\\\ue7c5\\"}"',
+    "@tmux_window_name_empty ''",
+    '@tmux_window_name_icon_style icon',
+    '@tmux_window_name_log_level "\'DEBUG\'"',
+    '@tmux_window_name_max_name_len 30',
+    "@tmux_window_name_substitute_sets \"[('.+ipython([32])', 'ipython\\\\g<1>')]\"",
+    '@tmux_window_name_home "\\~/a b"',
+    '@other_plugin_option 1',
+]
+
+
+def test_parse_show_options():
+    assert parse_show_options(SHOW_OPTIONS_OUTPUT) == {
+        'custom_icons': '{"python": "🐍", "x": "\\\\ue7c5"}',
+        'empty': '',
+        'icon_style': 'icon',
+        'log_level': "'DEBUG'",
+        'max_name_len': '30',
+        'substitute_sets': "[('.+ipython([32])', 'ipython\\g<1>')]",
+        'home': '~/a b',
+    }
+
+
+def test_from_options_single_query():
+    server = _fake_server(SHOW_OPTIONS_OUTPUT)
+    options = Options.from_options(server)
+
+    server.cmd.assert_called_once_with('show-options', '-g')
+    assert options.custom_icons == {'python': '🐍', 'x': '\ue7c5'}
+    assert options.icon_style == IconStyle.ICON
+    assert options.log_level == 'DEBUG'
+    assert options.max_name_len == 30
+    assert options.substitute_sets == [(re.compile('.+ipython([32])'), 'ipython\\g<1>')]
+    assert options.shells == Options().shells
+
+
+def test_from_options_defaults():
+    assert Options.from_options(_fake_server([])) == Options().compile()
+
+
+def test_parse_option_value_literals_only():
+    assert parse_option_value('shells', "['bash', 'zsh']", []) == ['bash', 'zsh']
+    assert parse_option_value('use_tilde', 'True', False) is True
+    assert parse_option_value('log_level', 'DEBUG', 'WARNING') == 'DEBUG'
+    assert parse_option_value('shells', "__import__('os').getcwd()", []) == "__import__('os').getcwd()"
+
+
+def test_from_options_snapshot(snapshot_file, monkeypatch):
+    options = Options.from_options(_fake_server(SHOW_OPTIONS_OUTPUT))
+    assert snapshot_file.exists()
+
+    # Same raw options load the parsed values from the snapshot
+    monkeypatch.setattr(rename_session_windows, 'parse_option_value', Mock(side_effect=AssertionError))
+    assert Options.from_options(_fake_server(SHOW_OPTIONS_OUTPUT)) == options
+    assert Options.from_options(_fake_server(SHOW_OPTIONS_OUTPUT)).options_hash == options.options_hash
+
+    # Changed raw options are parsed again
+    with pytest.raises(AssertionError):
+        Options.from_options(_fake_server(SHOW_OPTIONS_OUTPUT + ['@tmux_window_name_use_tilde True']))
+
+
+def test_from_options_snapshot_of_other_fields(snapshot_file):
+    options = Options.from_options(_fake_server(SHOW_OPTIONS_OUTPUT))
+    snapshot = json.loads(snapshot_file.read_text())
+    snapshot['options']['removed_option'] = 1
+    snapshot_file.write_text(json.dumps(snapshot))
+
+    assert Options.from_options(_fake_server(SHOW_OPTIONS_OUTPUT)) == options
+
+
+def test_options_hash_changes_with_the_plugin(monkeypatch):
+    options_hash = get_options_hash({'use_tilde': 'True'})
+    assert get_options_hash({'use_tilde': 'True'}) == options_hash
+
+    # Upgrades that change the defaults or the format of the options
+    monkeypatch.setattr(Options, '__repr__', lambda self: 'Options(max_name_len=30)')
+    assert get_options_hash({'use_tilde': 'True'}) != options_hash
+    monkeypatch.undo()
+    monkeypatch.setattr(
+        rename_session_windows, 'OPTIONS_FORMAT_VERSION', rename_session_windows.OPTIONS_FORMAT_VERSION + 1
+    )
+    assert get_options_hash({'use_tilde': 'True'}) != options_hash
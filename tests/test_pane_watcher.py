@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+
+import sys
+
+sys.path.append('scripts/')
+
+from pane_watcher import AdaptiveInterval, get_changed_pids
+
+
+def test_get_changed_pids():
+    old = {1: ((10, 100),), 2: ((20, 200),), 3: ()}
+    new = {1: ((10, 100),), 2: ((21, 300),), 3: ((30, 300),), 4: ((40, 400),)}
+    assert get_changed_pids(old, new) == {2, 3}
+    assert get_changed_pids({}, new) == set()
+
+
+def test_interval_backs_off_when_idle():
+    interval = AdaptiveInterval(0.1, 1, 0.01)
+    assert [interval.update(False, 0) for _ in range(5)] == [0.2, 0.4, 0.8, 1, 1]
+    assert interval.update(True, 0) == 0.1
+
+
+def test_interval_cpu_budget():
+    interval = AdaptiveInterval(0.1, 1, 0.01)
+    # 50ms samples in 1% of a CPU
+    assert interval.update(True, 0.05) == 4.95
+    assert AdaptiveInterval(0.1, 1, 0).update(True, 0.05) == 0.1
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import fcntl
+import os
+import signal
+import subprocess
+import sys
+import termios
+
+import pytest
+
+sys.path.append('scripts/')
+
+import process_utils
+from process_utils import get_programs_fingerprints, get_running_programs, get_running_programs_proc, parse_ps_output
+
+needs_proc = pytest.mark.skipif(not os.path.isdir('/proc/self/task'), reason='requires /proc')
+
+
+def test_parse_ps_output():
+    output = (
+        b' PPID COMMAND\n'
+        b'    1 -zsh\n'
+        b'  100 nvim README.md\n'
+        b'  100 [git] <defunct>\n'
+        b'  200 /usr/bin/python3 -m http.server\n'
+        b'  100 htop\n'
+    )
+    assert parse_ps_output(output) == {
+        1: [b'-zsh'],
+        100: [b'nvim README.md', b'htop'],
+        200: [b'/usr/bin/python3 -m http.server'],
+    }
+
+
+@pytest.fixture
+def child():
+    process = subprocess.Popen(['sleep', '30'])
+    # cmdline is empty until exec is done
+    while os.path.isdir('/proc/self') and process_utils.read_proc_cmdline(process.pid) is None:
+        pass
+
+    yield process
+    process.kill()
+    process.wait()
+
+
+@needs_proc
+def test_proc_children(child):
+    running_programs = get_running_programs_proc([os.getpid()])
+    assert b'sleep 30' in running_programs[os.getpid()]
+
+
+@needs_proc
+def test_proc_ppid_index_fallback(child, monkeypatch):
+    # Kernels without CONFIG_PROC_CHILDREN
+    monkeypatch.setattr(process_utils, 'read_proc_children', lambda pid: None)
+    running_programs = get_running_programs_proc([os.getpid()])
+    assert b'sleep 30' in running_programs[os.getpid()]
+
+
+@needs_proc
+def test_proc_zombies_skipped():
+    process = subprocess.Popen(['true'])
+    while open(f'/proc/{process.pid}/stat').read().split()[2] != 'Z':
+        pass
+
+    try:
+        assert get_running_programs_proc([os.getpid()]).get(os.getpid(), []) == []
+    finally:
+        process.wait()
+
+
+@needs_proc
+def test_foreground_program():
+    # Run a shell on a new terminal with a background job and a foreground program
+    master, slave = os.openpty()
+    shell = subprocess.Popen(
+        ['sh', '-c', 'sleep 31 & exec sh -ic "sleep 32"'],
+        stdin=slave,
+        stdout=slave,
+        stderr=slave,
+        start_new_session=True,
+        preexec_fn=lambda: fcntl.ioctl(0, termios.TIOCSCTTY, 0),
+    )
+    os.close(slave)
+
+    try:
+        while sorted(get_running_programs_proc([shell.pid]).get(shell.pid, [])) != [b'sleep 31', b'sleep 32']:
+            pass
+
+        assert get_running_programs([shell.pid], foreground=True) == {shell.pid: [b'sleep 32']}
+    finally:
+        os.killpg(shell.pid, signal.SIGKILL)
+        shell.wait()
+        os.close(master)
+
+
+@needs_proc
+def test_programs_fingerprints(child):
+    fingerprint = get_programs_fingerprints([os.getpid()])[os.getpid()]
+    assert child.pid in [pid for pid, _ in fingerprint]
+    assert get_programs_fingerprints([os.getpid()])[os.getpid()] == fingerprint
+
+    child.kill()
+    child.wait()
+    assert child.pid not in [pid for pid, _ in get_programs_fingerprints([os.getpid()])[os.getpid()]]
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import socket
+import sys
+import threading
+from typing import List
+
+sys.path.append('scripts/')
+
+from rename_daemon import get_daemon_socket_path, get_tmux_session_id, is_daemon_alive, send_message, serve
+
+
+def test_socket_path_per_server():
+    assert get_daemon_socket_path('/tmp/tmux-1000/default') == '/tmp/tmux-1000/tmux-window-name-default.sock'
+    assert get_daemon_socket_path('/tmp/tmux-1000/default') != get_daemon_socket_path('/tmp/tmux-1000/other')
+
+
+def test_serve_skips_foreign_file(tmp_path):
+    (tmp_path / 'daemon.sock').write_text('not a socket')
+
+    serve(str(tmp_path / 'daemon.sock'), lambda _: False, lambda: True)
+    assert (tmp_path / 'daemon.sock').read_text() == 'not a socket'
+
+
+def test_tmux_session_id(monkeypatch):
+    monkeypatch.setenv('TMUX', '/tmp/tmux-1000/default,1234,2')
+    assert get_tmux_session_id() == '$2'
+    monkeypatch.delenv('TMUX')
+    assert get_tmux_session_id() is None
+
+
+def test_send_without_daemon(tmp_path):
+    assert not send_message(str(tmp_path / 'daemon.sock'), 'rename')
+    assert not is_daemon_alive(str(tmp_path / 'daemon.sock'))
+
+
+def test_serve_until_stop(tmp_path):
+    socket_path = str(tmp_path / 'daemon.sock')
+    messages: List[str] = []
+
+    def handle(message: str) -> bool:
+        messages.append(message)
+        return message != 'stop'
+
+    # Leftover socket of a dead daemon
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as dead_daemon_socket:
+        dead_daemon_socket.bind(socket_path)
+
+    thread = threading.Thread(target=serve, args=(socket_path, handle, lambda: True))
+    thread.start()
+
+    while not is_daemon_alive(socket_path):
+        pass
+
+    assert send_message(socket_path, 'rename $1')
+    assert send_message(socket_path, 'stop')
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert messages == ['rename $1', 'stop']
+    assert not (tmp_path / 'daemon.sock').exists()
+
+
+def test_serve_coalesces_burst(tmp_path):
+    socket_path = str(tmp_path / 'daemon.sock')
+    messages: List[str] = []
+
+    def handle(message: str) -> bool:
+        messages.append(message)
+        return message != 'stop'
+
+    thread = threading.Thread(target=serve, args=(socket_path, handle, lambda: True, lambda: 0.2))
+    thread.start()
+
+    while not is_daemon_alive(socket_path):
+        pass
+
+    for message in ['rename $1', 'rename $2', 'rename $1', 'rename $1', 'stop']:
+        assert send_message(socket_path, message)
+    thread.join(timeout=5)
+
+    assert messages == ['rename $2', 'rename $1', 'stop']
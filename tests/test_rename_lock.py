@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import sys
+from typing import List
+
+import pytest
+
+sys.path.append('scripts/')
+
+from rename_lock import ALL_SESSIONS, merge_targets, run_exclusive, try_lock
+
+
+def test_run_alone(tmp_path):
+    targets: List[str] = []
+    assert run_exclusive(str(tmp_path / 'rename.lock'), '$1', targets.append)
+    assert targets == ['$1']
+
+
+def test_waiting_runs_rerun_once(tmp_path):
+    lock_path = str(tmp_path / 'rename.lock')
+    targets: List[str] = []
+
+    def run(target: str):
+        targets.append(target)
+        if len(targets) == 1:
+            # Requested while renaming, they wait for the holder
+            assert not run_exclusive(lock_path, '$2', targets.append)
+            assert not run_exclusive(lock_path, '$2', targets.append)
+
+    assert run_exclusive(lock_path, '$1', run)
+    assert targets == ['$1', '$2']
+
+
+def test_waiting_runs_of_other_sessions_rename_all(tmp_path):
+    lock_path = str(tmp_path / 'rename.lock')
+    targets: List[str] = []
+
+    def run(target: str):
+        targets.append(target)
+        if len(targets) == 1:
+            assert not run_exclusive(lock_path, '$2', targets.append)
+            assert not run_exclusive(lock_path, '$3', targets.append)
+
+    assert run_exclusive(lock_path, '$1', run)
+    assert targets == ['$1', ALL_SESSIONS]
+
+
+def test_failed_run_releases_lock(tmp_path):
+    lock_path = str(tmp_path / 'rename.lock')
+
+    def run(_: str):
+        raise RuntimeError()
+
+    with pytest.raises(RuntimeError):
+        run_exclusive(lock_path, '$1', run)
+
+    lock_file = try_lock(lock_path)
+    assert lock_file is not None
+    lock_file.close()
+
+
+def test_merge_targets():
+    assert merge_targets(['$1', '$1']) == '$1'
+    assert merge_targets(['']) == ''
+    assert merge_targets(['$1', '$2']) == ALL_SESSIONS
+    assert merge_targets(['$1', ALL_SESSIONS]) == ALL_SESSIONS
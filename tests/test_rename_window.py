@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import sys
+from unittest.mock import Mock
+
+sys.path.append('scripts/')
+
+import rename_session_windows
+from rename_session_windows import (
+    Options,
+    WindowState,
+    get_active_panes,
+    get_panes_programs,
+    get_panes_windows_states,
+    needs_process_scan,
+    post_restore,
+    rename_window,
+)
+from snapshot_collector import Snapshot
+from tmux_snapshot import FORMAT_SEPARATOR, PaneInfo, list_panes
+
+
+def test_rename_changed_name():
+    server = Mock()
+    assert rename_window(server, '@1', 'nvim:project', 20, Options(), 'project')
+    assert server.cmd.call_args_list[0].args == ('rename-window', '-t', '@1', 'nvim:project')
+    assert server.cmd.call_count == 3
+
+
+def test_skip_unchanged_name():
+    server = Mock()
+    assert not rename_window(server, '@1', 'project', 20, Options(), 'project')
+    server.cmd.assert_not_called()
+
+
+def test_skip_unchanged_shortened_name():
+    server = Mock()
+    assert not rename_window(server, '@1', 'a_very_long_project_name', 6, Options(), 'a_very')
+    server.cmd.assert_not_called()
+
+
+def test_rename_without_current_name():
+    server = Mock()
+    assert rename_window(server, '@1', 'project', 20, Options())
+    assert server.cmd.call_count == 3
+
+
+def test_get_panes_windows_states():
+    panes = [
+        PaneInfo('$1', '@0', '%0', True, 100, '/a', 'zsh', 'a', '1', True),
+        PaneInfo('$1', '@1', '%1', True, 101, '/b', 'zsh', 'b', '0', True),
+        PaneInfo('$1', '@2', '%2', True, 102, '/c', 'zsh', 'c', '', False),
+    ]
+    assert get_panes_windows_states(panes) == {
+        '@0': WindowState(True, True),
+        '@1': WindowState(False, True),
+        '@2': WindowState(True, False),
+    }
+
+
+def test_active_panes_of_linked_windows_once():
+    server = Mock()
+    server.cmd.return_value.stdout = [
+        FORMAT_SEPARATOR.join(['$0', '@0', '%0', '1', '100', '/a', 'zsh', 'a', '1', '1', '']),
+        FORMAT_SEPARATOR.join(['$0', '@0', '%1', '0', '101', '/b', 'zsh', 'a', '1', '1', '']),
+        FORMAT_SEPARATOR.join(['$1', '@1', '%2', '1', '102', '/c', 'zsh', 'c', '1', '1', '']),
+        FORMAT_SEPARATOR.join(['$1', '@0', '%0', '1', '100', '/a', 'zsh', 'a', '1', '1', '']),
+    ]
+    assert [p.pane_id for p in get_active_panes(list_panes(server, all_sessions=True))] == ['%0', '%2']
+
+
+def test_post_restore_batches_windows_options(monkeypatch):
+    renames = []
+    monkeypatch.setattr(rename_session_windows, 'rename_windows', lambda *args, **kwargs: renames.append(kwargs))
+    server = Mock()
+    server.cmd.return_value = Mock(stdout=['@0 1', '@1 0', '@0 1'], returncode=0)
+
+    post_restore(server, Options())
+    # One listing of the windows and one batch of their options
+    assert server.cmd.call_count == 2
+    batch = server.cmd.call_args.args
+    assert ('-t', '@0', '@tmux_window_name_enabled', '1') == batch[2:6]
+    assert ('-t', '@1', '@tmux_window_name_enabled', '0') == batch[9:13]
+    assert 'set-hook' in batch
+    assert renames == [{'all_sessions': True}]
+
+
+def test_needs_process_scan():
+    options = Options(show_program_args=False, ignored_programs=['htop'])
+    pane = PaneInfo('$1', '@0', '%0', True, 100, '/a', 'less', 'a')
+    assert not needs_process_scan(pane, options)
+    assert needs_process_scan(pane, Options())
+
+    for command in ['zsh', 'nvim', 'htop', '']:
+        assert needs_process_scan(pane._replace(pane_current_command=command), options)
+    # Started as `new-window less`, the pane process itself is the current command, the processes give its child
+    assert needs_process_scan(pane._replace(pane_start_command='less'), options)
+
+
+def test_panes_programs_from_current_command(monkeypatch):
+    running_programs_pids = []
+
+    def get_running_programs(pids, foreground, ps_programs):
+        running_programs_pids.extend(pids)
+        return {101: [b'bash script.sh']}
+
+    monkeypatch.setattr(rename_session_windows, 'get_running_programs', get_running_programs)
+    panes = [
+        PaneInfo('$1', '@0', '%0', True, 100, '/a', 'less', 'a'),
+        PaneInfo('$1', '@1', '%1', True, 101, '/b', 'bash', 'b'),
+    ]
+
+    panes_programs = get_panes_programs(Mock(), Options(show_program_args=False), snapshot=Snapshot(panes, None))
+    assert [p.program for p in panes_programs] == ['less', 'script.sh']
+    # Only the shell is read from the processes
+    assert running_programs_pids == [101]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import sys
+from unittest.mock import Mock
+
+sys.path.append('scripts/')
+
+import snapshot_collector
+from snapshot_collector import collect_snapshot
+from tmux_snapshot import FORMAT_SEPARATOR
+
+PANE_LINE = FORMAT_SEPARATOR.join(['$0', '@0', '%0', '1', '100', '/a', 'less', 'a', '1', '1', ''])
+
+
+def test_ps_runs_while_panes_are_listed(monkeypatch):
+    events = []
+    ps_process = Mock()
+    ps_process.__enter__ = Mock(return_value=ps_process)
+    ps_process.__exit__ = Mock(return_value=None)
+
+    def start_ps():
+        events.append('start_ps')
+        return ps_process
+
+    def read_ps(process):
+        assert process is ps_process
+        events.append('read_ps')
+        return {100: [b'less a']}
+
+    server = Mock()
+    server.cmd.side_effect = lambda *_: events.append('list-panes') or Mock(stdout=[PANE_LINE])
+    monkeypatch.setattr(snapshot_collector, 'is_proc_available', lambda: False)
+    monkeypatch.setattr(snapshot_collector, 'start_ps', start_ps)
+    monkeypatch.setattr(snapshot_collector, 'read_ps', read_ps)
+
+    snapshot = collect_snapshot(server, '$0')
+    assert events == ['start_ps', 'list-panes', 'read_ps']
+    assert [p.pane_id for p in snapshot.panes] == ['%0']
+    assert snapshot.ps_programs == {100: [b'less a']}
+
+
+def test_no_ps_with_proc(monkeypatch):
+    server = Mock()
+    server.cmd.return_value.stdout = [PANE_LINE]
+    monkeypatch.setattr(snapshot_collector, 'is_proc_available', lambda: True)
+    monkeypatch.setattr(snapshot_collector, 'start_ps', Mock(side_effect=AssertionError))
+
+    snapshot = collect_snapshot(server, all_sessions=True)
+    assert [p.pane_id for p in snapshot.panes] == ['%0']
+    assert snapshot.ps_programs is None
+
+
+def test_ps_only_when_the_panes_need_it(monkeypatch):
+    server = Mock()
+    server.cmd.return_value.stdout = [PANE_LINE]
+    monkeypatch.setattr(snapshot_collector, 'is_proc_available', lambda: False)
+    monkeypatch.setattr(snapshot_collector, 'start_ps', Mock(side_effect=AssertionError))
+    monkeypatch.setattr(snapshot_collector, 'get_running_programs_ps', lambda: {100: [b'less a']})
+
+    assert collect_snapshot(server, needs_ps=lambda panes: False).ps_programs is None
+    assert collect_snapshot(server, needs_ps=lambda panes: True).ps_programs == {100: [b'less a']}
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import re
+import sys
+
+sys.path.append('scripts/')
+
+from rename_session_windows import Options
+from substitute_rules import SubstituteRules, get_literal_prefix
+
+RULES = Options().substitute_sets + [
+    (r'^nvim (.+)', r'vim \g<1>'),
+    (r'^vim', 'vi'),
+    (r'^v', 'V'),
+    (r'\.py$', ''),
+    (r'manage\.py runserver', 'django'),
+    (r'^/usr/local/bin/', ''),
+    (r'a?pple', 'pear'),
+    (r'^(x|y)', 'z'),
+    (r'(?i)^DOCKER', 'docker'),
+    (r'^$', 'empty'),
+]
+
+NAMES = [
+    '',
+    'nvim README.md',
+    'vim',
+    'less ~/file.py',
+    '/usr/bin/python3 manage.py runserver',
+    '/usr/local/bin/htop',
+    '/bin/bash /home/user/script.sh arg',
+    'apple pineapple',
+    'Docker ps',
+    'x',
+    '/usr/bin/ipython3',
+]
+
+
+def _sequential_sub(name, rules):
+    for pattern, replacement in rules:
+        name = re.sub(pattern, replacement, name)
+    return name
+
+
+def test_get_literal_prefix():
+    assert get_literal_prefix(re.compile(r'^/usr/bin/(.+)')) == ('/usr/bin/', True)
+    assert get_literal_prefix(re.compile(r'nvim\.app')) == ('nvim.app', False)
+    assert get_literal_prefix(re.compile(r'ab?c')) == ('a', False)
+    assert get_literal_prefix(re.compile(r'ab+c')) == ('ab', False)
+    assert get_literal_prefix(re.compile(r'.+ipython([32])')) == ('', False)
+    assert get_literal_prefix(re.compile(r'^a|b')) == ('', False)
+    assert get_literal_prefix(re.compile(r'^abc', re.IGNORECASE)) == ('', False)
+    assert get_literal_prefix(re.compile(r'^\d+')) == ('', True)
+
+
+def test_same_as_sequential_sub():
+    rules = SubstituteRules(RULES)
+    for name in NAMES:
+        assert rules.apply(name) == _sequential_sub(name, RULES), name
+
+
+def test_skips_rules_that_cant_match():
+    rules = SubstituteRules(RULES)
+    candidates = [rules[i][0].pattern for i in rules.get_candidates('less ~/file.py')]
+    assert r'^nvim (.+)' not in candidates
+    assert r'manage\.py runserver' not in candidates
+    assert r'\.py$' in candidates
+
+
+def test_hits():
+    rules = SubstituteRules([(r'^nvim', 'vim'), (r'^vim', 'vi'), ('x', 'y')])
+    for name in ['nvim a', 'vim b', 'less']:
+        rules.apply(name)
+    assert rules.hits == [1, 2, 0]
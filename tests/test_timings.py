@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import sys
+import time
+from unittest.mock import Mock
+
+sys.path.append('scripts/')
+
+from timings import Timings, format_breakdown
+
+
+def test_disabled_phases_not_measured():
+    timings = Timings()
+    with timings.phase('list_panes'):
+        pass
+    assert timings.phases == {}
+
+
+def test_report_json_line(caplog):
+    timings = Timings()
+    timings.enable(False, time.perf_counter())
+    server = Mock()
+    timings.instrument_server(server)
+
+    with timings.phase('renames'):
+        server.cmd('rename-window', '-t', '@1', 'a', ';', 'rename-window', '-t', '@2', 'b')
+    server.cmd('list-panes')
+
+    with caplog.at_level(logging.INFO):
+        timings.report()
+
+    record = json.loads(caplog.records[-1].getMessage().split(' ', 1)[1])
+    assert record['tmux_commands'] == 3
+    assert record['tmux_invocations'] == 2
+    assert 'renames' in record['phases_ms']
+    assert record['total_ms'] >= record['phases_ms']['renames']
+    assert timings.phases == {}
+    assert timings.counters['tmux_commands'] == 0
+
+
+def test_format_breakdown():
+    record = {'total_ms': 50, 'phases_ms': {'startup': 25, 'other': 25}, 'tmux_commands': 7, 'tmux_invocations': 5}
+    assert format_breakdown(record).splitlines() == [
+        'total                 50.0 ms',
+        '  startup             25.0 ms   50%',
+        '  other               25.0 ms   50%',
+        'tmux commands: 7 (5 invocations)',
+    ]
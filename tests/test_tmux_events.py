@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import sys
+from unittest.mock import Mock
+
+sys.path.append('scripts/')
+
+from tmux_events import (
+    SETTLE_TIMEOUT,
+    NotificationReader,
+    SettlingWindows,
+    get_added_windows,
+    get_event_targets,
+    list_windows_sessions,
+)
+
+
+def test_get_event_targets():
+    lines = [
+        '%session-changed $0 main',
+        '%window-add @7',
+        '%unlinked-window-close @5',
+        '%window-pane-changed @2 %4',
+        '%session-window-changed $1 @3',
+        '%subscription-changed tmux_window_name $0 @7 3 %7 : nvim /tmp',
+        '%subscription-changed other $0 @8 3 %8 : x',
+        '%window-renamed @7 tmp',
+    ]
+    assert get_event_targets(lines) == ({'@7', '@5', '@2'}, {'$1'})
+    assert get_event_targets([]) == (set(), set())
+
+
+def test_get_added_windows():
+    lines = ['%window-add @7', '%unlinked-window-add @8', '%window-close @3', '%window-pane-changed @2 %4']
+    assert get_added_windows(lines) == {'@7', '@8'}
+    assert get_added_windows([]) == set()
+
+
+def test_settling_windows_until_programs_are_the_same():
+    settling_windows = SettlingWindows()
+    assert settling_windows.get_timeout(0) is None
+    settling_windows.add({'@5'}, 0)
+    assert settling_windows.get_timeout(0) == 1
+    assert not settling_windows.is_due(0.5)
+
+    # The shell startup program is running on the first check
+    assert settling_windows.is_due(1)
+    assert settling_windows.check({'@5': 'bash, pyenv init'}, 1) == {'@5'}
+    # It exited after the first check, nothing notifies it
+    assert settling_windows.is_due(2)
+    assert settling_windows.check({'@5': 'bash'}, 2) == {'@5'}
+    # Same programs on two checks in a row
+    assert settling_windows.check({'@5': 'bash'}, 3) == set()
+    assert settling_windows.get_timeout(3) is None
+
+
+def test_settling_windows_timeout():
+    settling_windows = SettlingWindows()
+    settling_windows.add({'@5', '@6'}, 0)
+    # @6 closed
+    assert settling_windows.check({'@5': 1}, 1) == {'@5'}
+    check_time = 2
+    while check_time < SETTLE_TIMEOUT:
+        assert settling_windows.check({'@5': check_time}, check_time) == {'@5'}
+        check_time += 1
+
+    assert settling_windows.check({'@5': check_time}, check_time) == {'@5'}
+    assert not settling_windows.is_due(check_time + 1)
+
+
+def test_list_windows_sessions():
+    server = Mock()
+    server.cmd.return_value.stdout = ['@0 $0', '@1 $0', '@0 $1']
+    assert list_windows_sessions(server) == {'@0': {'$0', '$1'}, '@1': {'$0'}}
+
+
+def test_reader_skips_replies():
+    reader = NotificationReader(Mock(), '$0')
+    lines = [
+        '%begin 1700000000 12 0',
+        '%end 1700000000 12 0',
+        '%window-add @7',
+        '%begin 1700000000 13 1',
+        '%window-add @8',  # output that looks like a notification
+        '%error 1700000000 13 1',
+        '%window-close @7',
+    ]
+    assert [line for line in lines if reader._read_line(line) is not None] == ['%window-add @7', '%window-close @7']
+    assert reader.replies == 2
+    assert reader.failed_replies == 1
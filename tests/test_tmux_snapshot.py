@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import sys
+from unittest.mock import Mock
+
+sys.path.append('scripts/')
+
+from tmux_snapshot import FORMAT_SEPARATOR, PaneInfo, list_panes, list_windows_automatic_rename
+
+
+def _line(*fields: str) -> str:
+    return FORMAT_SEPARATOR.join(fields)
+
+
+def test_list_panes_current_session():
+    server = Mock()
+    server.cmd.return_value.stdout = [
+        _line('$1', '@1', '%1', '1', '100', '/home/user/my project', 'nvim', 'nvim:my project', '1', '0', ''),
+        _line('$1', '@1', '%2', '0', '101', '', 'zsh', 'nvim:my project', '1', '0', ''),
+    ]
+
+    assert list_panes(server) == [
+        PaneInfo('$1', '@1', '%1', True, 100, '/home/user/my project', 'nvim', 'nvim:my project', '1'),
+        PaneInfo('$1', '@1', '%2', False, 101, None, 'zsh', 'nvim:my project', '1'),
+    ]
+    assert server.cmd.call_args.args[0] == 'list-panes'
+    assert server.cmd.call_args.args[-1] == '-s'
+
+
+def test_list_panes_targets():
+    server = Mock()
+    server.cmd.return_value.stdout = []
+
+    list_panes(server, '$2')
+    assert server.cmd.call_args.args[-3:] == ('-s', '-t', '$2')
+
+    list_panes(server, all_sessions=True)
+    assert server.cmd.call_args.args[-1] == '-a'
+
+
+def test_list_windows_automatic_rename():
+    server = Mock()
+    # Linked windows are listed once per session
+    server.cmd.return_value.stdout = ['@1 1', '@2 0', '@1 1']
+
+    assert list_windows_automatic_rename(server) == {'@1': True, '@2': False}
+    assert server.cmd.call_args.args[:2] == ('list-windows', '-a')
+
+
+def test_list_panes_start_command_with_separator():
+    server = Mock()
+    server.cmd.return_value.stdout = [_line('$1', '@1', '%1', '1', '100', '/a', 'sh', 'a', '1', '0', 'sh -c "a␞b"')]
+
+    assert list_panes(server)[0].pane_start_command == 'sh -c "a␞b"'
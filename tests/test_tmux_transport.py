@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import sys
+from unittest.mock import Mock, call
+
+sys.path.append('scripts/')
+
+from tmux_transport import TmuxCommandBatch, chain_commands, format_command, parse_reply
+
+
+def _lines(output: str):
+    return iter(output.splitlines())
+
+
+def test_parse_reply_output():
+    lines = _lines('%begin 1700000000 12 1\ntmp\npackage\n\n%end 1700000000 12 1\n')
+    reply = parse_reply(lines)
+    assert reply is not None
+    assert reply.stdout == ['tmp', 'package']
+    assert reply.returncode == 0
+    assert parse_reply(lines) is None
+
+
+def test_parse_reply_error():
+    reply = parse_reply(_lines('%begin 1700000000 13 1\nparse error: unknown command: x\n%error 1700000000 13 1\n'))
+    assert reply is not None
+    assert reply.stderr == ['parse error: unknown command: x']
+    assert reply.returncode == 1
+
+
+def test_parse_reply_skips_notifications():
+    lines = _lines(
+        '%window-add @2\n'
+        '%session-changed $1 main\n'
+        '%begin 1700000000 14 1\n'
+        '%end 1699999999 2 0\n'  # output that looks like a guard line of another command
+        '%end 1700000000 14 1\n'
+        '%begin 1700000000 15 1\n'
+        'second\n'
+        '%end 1700000000 15 1\n'
+    )
+    first = parse_reply(lines)
+    second = parse_reply(lines)
+    assert first is not None and first.stdout == ['%end 1699999999 2 0']
+    assert second is not None and second.stdout == ['second']
+
+
+def test_format_command():
+    assert format_command(['rename-window', '-t', '@1', "it's; a"]) == "'rename-window' '-t' '@1' 'it'\\''s; a'"
+
+
+def test_chain_commands():
+    assert chain_commands([['rename-window', '-t', '@1', 'a;'], ['set-option', '-wq', 'automatic-rename', 'on']]) == [
+        'rename-window',
+        '-t',
+        '@1',
+        'a\\;',
+        ';',
+        'set-option',
+        '-wq',
+        'automatic-rename',
+        'on',
+    ]
+
+
+def test_batch_submit_single_invocation():
+    server = Mock()
+    server.cmd.return_value.returncode = 0
+    batch = TmuxCommandBatch()
+    batch.cmd('rename-window', '-t', '@1', 'a')
+    batch.cmd('rename-window', '-t', '@2', 'b')
+
+    assert batch.submit(server) == 2
+    server.cmd.assert_called_once_with('rename-window', '-t', '@1', 'a', ';', 'rename-window', '-t', '@2', 'b')
+    assert len(batch) == 0
+    assert batch.submit(server) == 0
+
+
+def test_batch_submit_failure_runs_one_by_one():
+    server = Mock()
+    server.cmd.return_value.returncode = 1
+    batch = TmuxCommandBatch()
+    batch.cmd('rename-window', '-t', '@1', 'a')
+    batch.cmd('rename-window', '-t', '@2', 'b')
+
+    batch.submit(server)
+    assert server.cmd.call_args_list[1:] == [
+        call('rename-window', '-t', '@1', 'a'),
+        call('rename-window', '-t', '@2', 'b'),
+    ]